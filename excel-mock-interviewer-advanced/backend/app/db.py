@@ -1,13 +1,30 @@
-from sqlalchemy import create_engine, Column, String, Float, Integer, Text, DateTime
+from sqlalchemy import create_engine, event, Column, String, Float, Integer, Text, DateTime
 from sqlalchemy.orm import declarative_base, sessionmaker
 from sqlalchemy.sql import func
+from sqlalchemy.exc import OperationalError
 import os
 DB_URL=os.getenv("DB_URL","sqlite:///./data.db")
 engine=create_engine(DB_URL, connect_args={"check_same_thread": False} if DB_URL.startswith("sqlite") else {})
+if DB_URL.startswith("sqlite"):
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(conn, _):
+        # WAL lets readers run during writes; NORMAL syncs at checkpoints instead of every commit
+        cur=conn.cursor(); cur.execute("PRAGMA journal_mode=WAL"); cur.execute("PRAGMA synchronous=NORMAL"); cur.execute("PRAGMA busy_timeout=5000"); cur.close()
 SessionLocal=sessionmaker(bind=engine,autocommit=False,autoflush=False)
 Base=declarative_base()
 class Interview(Base):
-    __tablename__="interviews"; id=Column(String, primary_key=True, index=True); candidate_email=Column(String); created_at=Column(DateTime, server_default=func.now())
+    __tablename__="interviews"; id=Column(String, primary_key=True, index=True); candidate_email=Column(String); created_at=Column(DateTime, server_default=func.now(), index=True)
 class Answer(Base):
-    __tablename__="answers"; id=Column(Integer, primary_key=True, autoincrement=True); interview_id=Column(String, index=True); question_id=Column(String, index=True); score=Column(Float, default=0.0); feedback=Column(Text, default=""); answer_text=Column(Text); answer_table_json=Column(Text); created_at=Column(DateTime, server_default=func.now())
-def init_db(): Base.metadata.create_all(bind=engine)
+    __tablename__="answers"; id=Column(Integer, primary_key=True, autoincrement=True); interview_id=Column(String, index=True); question_id=Column(String, index=True); score=Column(Float, default=0.0); feedback=Column(Text, default=""); answer_text=Column(Text); answer_table_json=Column(Text); created_at=Column(DateTime, server_default=func.now(), index=True)
+class AnswerStat(Base):
+    # running score sums per question: bucket 0 = all answers, then one row per minute of the last day
+    # (UTC minutes since the epoch) for the windows; bucket -1 marks that historic answers were folded in
+    __tablename__="answer_stats"; question_id=Column(String, primary_key=True); bucket=Column(Integer, primary_key=True, index=True); count=Column(Integer, default=0); total=Column(Float, default=0.0); sumsq=Column(Float, default=0.0); passes=Column(Integer, default=0)
+def init_db():
+    try: Base.metadata.create_all(bind=engine)
+    except OperationalError: Base.metadata.create_all(bind=engine)  # another worker created the tables first
+    # create_all skips existing tables: add indexes introduced later (e.g. created_at, for exports)
+    for t in Base.metadata.sorted_tables:
+        for ix in t.indexes:
+            try: ix.create(bind=engine, checkfirst=True)
+            except OperationalError: pass  # created concurrently
@@ -0,0 +1,168 @@
+"""
+Stream interviews or answers out of the database for analytics.
+
+    python -m app.export answers [--format ndjson|csv] [--gzip] [--since 2026-01-01T00:00:00]
+                                 [--watermark FILE] [--out FILE]
+
+Rows are read with a streaming cursor (server-side where the database supports it) in
+chunks of --chunk and written as NDJSON or CSV, optionally gzip-compressed on the fly,
+so memory stays flat however large the table is. Each export covers
+since <= created_at < until, where `until` is the database clock when the export starts
+minus EXPORT_SETTLE_SECS. created_at is stamped when a row is written (see
+app.services.persist), so anything older than that margin is committed, and rows still
+in flight fall into the next export. With --watermark the `since` value is read from FILE and the new `until`
+written back after a successful run, making repeated runs incremental. The same
+generator backs GET /admin/export/{table} (until returned in X-Export-Until).
+"""
+import io, os, csv, sys, json, zlib, argparse, datetime as dt
+from typing import Iterator, Optional
+
+from sqlalchemy import String, func, literal, select
+
+from app.db import engine, Interview, Answer
+
+TABLES = {"interviews": Interview, "answers": Answer}
+FORMATS = ("ndjson", "csv")
+CHUNK_ROWS = 1000
+FLUSH_BYTES = 64 * 1024  # bytes buffered before a piece is yielded
+# how long after its created_at a row may still be uncommitted (write + lock wait + clock skew)
+EXPORT_SETTLE_SECS = float(os.getenv("EXPORT_SETTLE_SECS", "10"))
+
+
+def parse_time(value: Optional[str]) -> Optional[dt.datetime]:
+    """ISO-8601 watermark as naive UTC (a trailing Z or offset is accepted); None passes through."""
+    if not value:
+        return None
+    t = dt.datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if t.tzinfo is not None:  # created_at is stored in UTC
+        t = t.astimezone(dt.timezone.utc).replace(tzinfo=None)
+    return t.replace(microsecond=0)
+
+
+def format_time(value: dt.datetime) -> str:
+    return value.replace(microsecond=0).isoformat()
+
+
+def _bound(value: dt.datetime):
+    # SQLite keeps created_at as "YYYY-MM-DD HH:MM:SS" text; compare in that exact form
+    # (a bound datetime would carry ".000000" and sort after the same second)
+    if engine.dialect.name == "sqlite":
+        return literal(value.strftime("%Y-%m-%d %H:%M:%S"), type_=String)
+    return value
+
+
+def db_now() -> dt.datetime:
+    """The database clock as naive UTC, to the second."""
+    with engine.connect() as conn:
+        now = conn.execute(select(func.now())).scalar()
+    if isinstance(now, str):
+        now = dt.datetime.fromisoformat(now)
+    if now.tzinfo is not None:  # e.g. PostgreSQL: the session's time zone; created_at is UTC
+        now = now.astimezone(dt.timezone.utc)
+    return now.replace(tzinfo=None, microsecond=0)
+
+
+def settled_until() -> dt.datetime:
+    """The `until` of an export starting now: rows stamped before it are all committed."""
+    return db_now() - dt.timedelta(seconds=EXPORT_SETTLE_SECS)
+
+
+def _cell(v):
+    return format_time(v) if isinstance(v, dt.datetime) else v
+
+
+def _encode_ndjson(cols, rows, out: io.StringIO):
+    for row in rows:
+        out.write(json.dumps(dict(zip(cols, map(_cell, row))), ensure_ascii=False, separators=(",", ":")))
+        out.write("\n")
+
+
+def _encode_csv(cols, rows, out: io.StringIO):
+    csv.writer(out, lineterminator="\n").writerows([_cell(v) for v in row] for row in rows)
+
+
+def stream(table: str, fmt: str = "ndjson", since: Optional[dt.datetime] = None, until: Optional[dt.datetime] = None,
+         gzip: bool = False, chunk: int = CHUNK_ROWS, stats: Optional[dict] = None) -> Iterator[bytes]:
+    """Yield the encoded export of `table` in pieces of roughly FLUSH_BYTES."""
+    model = TABLES[table]
+    encode = _encode_ndjson if fmt == "ndjson" else _encode_csv
+    cols = [c.name for c in model.__table__.columns]
+    stmt = select(*model.__table__.columns).order_by(model.created_at)
+    if since is not None:
+        stmt = stmt.where(model.created_at >= _bound(since))
+    if until is not None:
+        stmt = stmt.where(model.created_at < _bound(until))
+    z = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None  # wbits 31: gzip container
+    buf = io.StringIO()
+    if fmt == "csv":
+        csv.writer(buf, lineterminator="\n").writerow(cols)
+    n = 0
+
+    def flush() -> bytes:
+        data = buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+        return z.compress(data) if z else data
+
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk).execute(stmt)
+        for part in result.partitions():
+            encode(cols, part, buf)
+            n += len(part)
+            if buf.tell() >= FLUSH_BYTES:
+                piece = flush()
+                if piece:
+                    yield piece
+    tail = flush() + (z.flush() if z else b"")
+    if tail:
+        yield tail
+    if stats is not None:
+        stats["rows"] = n
+
+
+def _read_watermark(path: str) -> Optional[dt.datetime]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return parse_time(json.load(f).get("until"))
+    except (OSError, ValueError):
+        return None
+
+
+def _write_watermark(path: str, table: str, until: dt.datetime, n: int):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"table": table, "until": format_time(until), "rows": n}, f)
+    os.replace(tmp, path)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m app.export", description="Stream a table out as NDJSON or CSV.")
+    p.add_argument("table", choices=sorted(TABLES))
+    p.add_argument("--format", choices=FORMATS, default="ndjson")
+    p.add_argument("--gzip", action="store_true")
+    p.add_argument("--since", help="only rows with created_at >= this (ISO-8601)")
+    p.add_argument("--until", help="only rows with created_at < this (default: now - EXPORT_SETTLE_SECS)")
+    p.add_argument("--watermark", help="JSON file holding the last export's `until`; used as --since and updated")
+    p.add_argument("--chunk", type=int, default=CHUNK_ROWS, help="rows fetched per round trip")
+    p.add_argument("--out", help="output file (default: stdout)")
+    a = p.parse_args(argv)
+    since = parse_time(a.since) or (_read_watermark(a.watermark) if a.watermark else None)
+    until = parse_time(a.until) or settled_until()
+    stats: dict = {}
+    out = open(a.out, "wb") if a.out else sys.stdout.buffer
+    try:
+        for piece in stream(a.table, a.format, since, until, a.gzip, a.chunk, stats):
+            out.write(piece)
+    finally:
+        if a.out:
+            out.close()
+        else:
+            out.flush()
+    if a.watermark:
+        _write_watermark(a.watermark, a.table, until, stats["rows"])
+    print(json.dumps({"table": a.table, "rows": stats["rows"], "since": since and format_time(since),
+                      "until": format_time(until)}), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
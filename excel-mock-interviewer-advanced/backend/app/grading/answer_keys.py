@@ -0,0 +1,291 @@
+import os, math, time, hashlib, pathlib, threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.grading import columnar
+from app.questions.bank import all_meta
+
+DATA_DIR = pathlib.Path(__file__).parents[1] / "questions" / "datasets"
+
+# How often (seconds) a dataset file is re-stat'ed for changes.
+CHECK_INTERVAL = float(os.getenv("ANSWER_KEY_CHECK_SECS", "1.0"))
+
+# Perturbed copies per dataset that a formula must also get right (see perturbed()); datasets
+# larger than PERTURB_MAX_ROWS are only checked against the real data.
+PERTURB_COPIES = int(os.getenv("FORMULA_PERTURB_COPIES", "3"))
+PERTURB_MAX_ROWS = int(os.getenv("FORMULA_PERTURB_MAX_ROWS", "200000"))
+
+# Column types per dataset; unknown datasets fall back to pandas inference.
+SCHEMAS: Dict[str, Dict[str, str]] = {
+    "sales.csv": {
+        "Region": "category",
+        "Rep": "category",
+        "Item": "category",
+        "Units": "int64",
+        "UnitPrice": "float64",
+    },
+}
+
+# eval_key -> (dataset file, compute fn)
+_KEYS: Dict[str, tuple] = {}
+
+
+def answer_key(name: str, dataset: str):
+    """Register `fn(df)` as the answer key `name` computed over `dataset`."""
+    def deco(fn: Callable[[pd.DataFrame], Any]):
+        _KEYS[name] = (dataset, fn)
+        return fn
+    return deco
+
+
+# ---------- Answer keys ----------
+@answer_key("total_units_east_pencil", "sales.csv")
+def _total_units_east_pencil(df: pd.DataFrame) -> float:
+    return float(df[(df.Region == "East") & (df.Item == "Pencil")]["Units"].sum())
+
+
+@answer_key("total_units_east_pencil_jones", "sales.csv")
+def _total_units_east_pencil_jones(df: pd.DataFrame) -> float:
+    return float(df[(df.Region == "East") & (df.Item == "Pencil") & (df.Rep == "Jones")]["Units"].sum())
+
+
+@answer_key("unitprice_rep_item", "sales.csv")
+def _unitprice_rep_item(df: pd.DataFrame) -> float:
+    r = df[(df.Rep == "Kivell") & (df.Item == "Binder")]
+    return float(r["UnitPrice"].iloc[0]) if not r.empty else float("nan")
+
+
+@answer_key("region_total_sales_desc", "sales.csv")
+def _region_total_sales_desc(df: pd.DataFrame) -> pd.DataFrame:
+    sales = df.assign(Sales=df["Units"] * df["UnitPrice"])
+    out = sales.groupby("Region", as_index=False, observed=True)["Sales"].sum()
+    out["Region"] = out["Region"].astype(str)
+    return out.sort_values("Sales", ascending=False).reset_index(drop=True)
+
+
+# ---------- Dataset cache ----------
+# Each dataset is held as a memory-mapped columnar table (see columnar.py); frames are
+# only built transiently to compute answer keys, so no worker keeps a private copy.
+class _Dataset:
+    __slots__ = ("name", "path", "mtime_ns", "size", "digest", "table", "checked_at")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.path = DATA_DIR / name
+        self.digest = ""
+        self.table: Optional[columnar.Table] = None
+        self.mtime_ns = self.size = -1
+        self.checked_at = 0.0
+
+
+_LOCK = threading.RLock()
+_DATASETS: Dict[str, _Dataset] = {}
+_VALUES: Dict[str, tuple] = {}  # eval_key -> (dataset digest, value)
+_STATS = {"hits": 0, "misses": 0, "reloads": 0}
+
+
+def _digest(path: pathlib.Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _refresh(ds: _Dataset) -> bool:
+    """Reload `ds` if its file changed (mtime/size, then content hash). Returns True on reload."""
+    now = time.monotonic()
+    if ds.table is not None and now - ds.checked_at < CHECK_INTERVAL:
+        return False
+    ds.checked_at = now
+    st = ds.path.stat()
+    if ds.table is not None and (st.st_mtime_ns, st.st_size) == (ds.mtime_ns, ds.size):
+        return False
+    ds.mtime_ns, ds.size = st.st_mtime_ns, st.st_size
+    digest = _digest(ds.path)
+    if ds.table is not None and digest == ds.digest:
+        return False  # touched but unchanged
+    ds.table = columnar.open_table(ds.name, ds.path, digest, SCHEMAS.get(ds.name))
+    ds.digest = digest
+    _STATS["reloads"] += 1
+    return True
+
+
+def table(name: str) -> columnar.Table:
+    """Mapped columnar table for a dataset file (reloaded when the file changes)."""
+    with _LOCK:
+        ds = _DATASETS.get(name)
+        if ds is None:
+            ds = _DATASETS[name] = _Dataset(name)
+        if _refresh(ds):
+            _recompute(name)
+        return ds.table
+
+
+def dataset(name: str) -> pd.DataFrame:
+    """Typed frame for a dataset file, built on demand over the mapped columns."""
+    return table(name).frame()
+
+
+def dataset_for(key: Optional[str]) -> Optional[str]:
+    """Dataset file an answer key is computed over."""
+    entry = _KEYS.get(key)
+    return entry[0] if entry else None
+
+
+def version(name: str) -> str:
+    """Content hash of the currently loaded copy of a dataset."""
+    with _LOCK:
+        table(name)
+        return _DATASETS[name].digest
+
+
+def _compute(key: str, frame: Optional[pd.DataFrame] = None):
+    name, fn = _KEYS[key]
+    ds = _DATASETS[name]
+    _STATS["misses"] += 1
+    value = fn(ds.table.frame() if frame is None else frame)
+    _VALUES[key] = (ds.digest, value)
+    return value
+
+
+def _recompute(name: str):
+    """Eagerly rebuild every bank key that depends on dataset `name` (one shared frame)."""
+    keys = [k for k in _bank_keys() if k in _KEYS and _KEYS[k][0] == name]
+    if keys:
+        frame = _DATASETS[name].table.frame()
+        for key in keys:
+            _compute(key, frame)
+
+
+def _bank_keys():
+    return {q["eval_key"] for q in all_meta() if q.get("eval_key")}
+
+
+def get(key: Optional[str]):
+    """Answer key value for `key`, or None if no such key is registered."""
+    if key not in _KEYS:
+        return None
+    with _LOCK:
+        table(_KEYS[key][0])
+        cached = _VALUES.get(key)
+        if cached and cached[0] == _DATASETS[_KEYS[key][0]].digest:
+            _STATS["hits"] += 1
+            return cached[1]
+        return _compute(key)
+
+
+# ---------- Perturbed copies ----------
+# Same shape as the dataset, rows reordered and numbers shifted, with near-miss decoys ahead of a record
+# the key depends on: copies of it with one of the text fields the key looks at changed.
+# A formula that computes the key from the ranges and all its criteria matches the key
+# recomputed on each copy; a hardcoded number, a cell picked by position or a lookup that
+# skips a criterion does not. Decoys take the place of rows the key does not depend on.
+RELEVANCE_MAX_ROWS = 2000  # above this, decoys are built from random rows instead
+_PERTURBED: Dict[str, tuple] = {}  # eval_key -> (dataset digest, [(name, table, expected)])
+
+
+def _same(a, b) -> bool:
+    if isinstance(a, float) and isinstance(b, float):
+        return a == b or (math.isnan(a) and math.isnan(b))
+    return a == b
+
+
+def _relevant_rows(df: pd.DataFrame, fn, base) -> List[int]:
+    """Rows whose removal changes the key."""
+    return [i for i in range(len(df)) if not _same(fn(df.drop(index=i).reset_index(drop=True)), base)]
+
+
+def _text_columns(df: pd.DataFrame) -> List[str]:
+    return [c for c in df.columns
+            if isinstance(df[c].dtype, pd.CategoricalDtype) or not pd.api.types.is_numeric_dtype(df[c].dtype)]
+
+
+def _perturb(df: pd.DataFrame, fn, base, target: int, keep: set, rng: np.random.Generator) -> pd.DataFrame:
+    n = len(df)
+    decoys = []
+    for col in _text_columns(df):
+        values = df[col].dropna().unique()
+        others = values[values != df.at[target, col]]
+        if len(others):
+            swapped = df.copy()
+            swapped.iloc[target, df.columns.get_loc(col)] = others[rng.integers(len(others))]
+            if not _same(fn(swapped), base):  # only fields the key looks at make near misses
+                decoys.append(swapped.iloc[[target]])
+    spare = set([i for i in rng.permutation(n) if i not in keep and i != target][:len(decoys)])
+    decoys = decoys[:len(spare)]
+    # decoys and the remaining rows in random order, the record itself somewhere after the last decoy
+    ext = pd.concat([df] + decoys, ignore_index=True)  # decoys are rows n, n+1, ...
+    order = np.array([i for i in range(n) if i not in spare and i != target] + list(range(n, n + len(decoys))))
+    order = order[rng.permutation(len(order))]
+    last = int(np.flatnonzero(order >= n).max()) if decoys else -1
+    order = np.insert(order, int(rng.integers(last + 1, len(order) + 1)), target)
+    out = ext.iloc[order].reset_index(drop=True)
+    for col in df.columns:
+        out[col] = out[col].astype(df[col].dtype)
+        if pd.api.types.is_integer_dtype(out[col].dtype):
+            out[col] = out[col] + rng.integers(1, 10, n)
+        elif pd.api.types.is_float_dtype(out[col].dtype):
+            out[col] = (out[col] + rng.integers(1, 100, n) / 8.0).round(4)
+    return out
+
+
+def _usable(value) -> bool:
+    if isinstance(value, str):
+        return True
+    return isinstance(value, (int, float, np.integer, np.floating)) and math.isfinite(value) and value != 0
+
+
+def perturbed(key: Optional[str]) -> List[Tuple[str, columnar.Table, Any]]:
+    """[(sheet name, table, expected value)] for the perturbed copies of `key`'s dataset.
+    Copies where the key is undefined (e.g. the looked-up record no longer exists) are skipped."""
+    if key not in _KEYS or PERTURB_COPIES <= 0:
+        return []
+    name, fn = _KEYS[key]
+    with _LOCK:
+        tbl = table(name)
+        digest = _DATASETS[name].digest
+        cached = _PERTURBED.get(key)
+        if cached and cached[0] == digest:
+            return cached[1]
+        copies = []
+        if 1 < tbl.nrows <= PERTURB_MAX_ROWS:
+            frame = tbl.frame()
+            rng = np.random.default_rng(0)
+            base = fn(frame)
+            if len(frame) <= RELEVANCE_MAX_ROWS:
+                keep = _relevant_rows(frame, fn, base)
+            else:
+                keep = [int(i) for i in rng.choice(len(frame), size=PERTURB_COPIES, replace=False)]
+            for attempt in range(PERTURB_COPIES * 4):
+                if len(copies) == PERTURB_COPIES or not keep:
+                    break
+                df = _perturb(frame, fn, base, keep[attempt % len(keep)], set(keep), rng)
+                value = fn(df)
+                if _usable(value):  # a zero or missing result cannot tell most wrong formulas apart
+                    sheet = f"{name}#{key}#{attempt}"  # sheet cache key
+                    copies.append((sheet, columnar.from_frame(sheet, df, digest), value))
+        _PERTURBED[key] = (digest, copies)
+        return copies
+
+
+def warm():
+    """Load datasets and compute every eval_key named in the bank."""
+    with _LOCK:
+        for name in sorted({_KEYS[k][0] for k in _bank_keys() if k in _KEYS}):
+            table(name)
+
+
+def stats() -> Dict[str, Any]:
+    with _LOCK:
+        return {
+            **_STATS,
+            "keys": len(_VALUES),
+            "datasets": {
+                n: {"rows": 0 if d.table is None else d.table.nrows, "mapped_bytes": 0 if d.table is None else d.table.nbytes(),
+                    "sha256": d.digest[:12]}
+                for n, d in _DATASETS.items()
+            },
+        }
@@ -0,0 +1,195 @@
+import os, json, shutil, pathlib, tempfile
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Datasets are converted once from CSV into a columnar cache: one .npy file per column,
+# text columns dictionary-encoded as int32 codes (-1 = blank) plus a small JSON dictionary.
+# Workers open the files with np.load(mmap_mode="r"), so every process maps the same
+# page-cache pages instead of parsing the CSV into its own copy.
+_DATA_DIR = pathlib.Path(__file__).parents[1] / "questions" / "datasets"
+_CACHE_ROOT = _DATA_DIR if os.access(_DATA_DIR, os.W_OK) else pathlib.Path(tempfile.gettempdir())  # read-only deploys
+CACHE_DIR = pathlib.Path(os.getenv("DATASET_CACHE_DIR", str(_CACHE_ROOT / ".columnar")))
+CHUNK_ROWS = int(os.getenv("DATASET_CHUNK_ROWS", "250000"))  # CSV rows parsed per chunk during conversion
+FORMAT = 1  # bump when the on-disk layout changes
+
+_TEXT_DTYPES = ("category", "object", "str", "string")
+
+
+class Column:
+    """One column: `data` is the values, or int32 codes into `dictionary` for text columns."""
+    __slots__ = ("name", "data", "dictionary")
+
+    def __init__(self, name: str, data: np.ndarray, dictionary: Optional[np.ndarray] = None):
+        self.name = name
+        self.data = data
+        self.dictionary = dictionary  # object array of distinct values, or None for numeric columns
+
+    @property
+    def is_text(self) -> bool:
+        return self.dictionary is not None
+
+    def series(self) -> pd.Series:
+        if self.is_text:
+            return pd.Series(pd.Categorical.from_codes(self.data, categories=self.dictionary), name=self.name)
+        return pd.Series(self.data, name=self.name, copy=False)
+
+
+class Table:
+    """A converted dataset: memory-mapped columns in file order."""
+    __slots__ = ("name", "digest", "nrows", "columns")
+
+    def __init__(self, name: str, digest: str, nrows: int, columns: List[Column]):
+        self.name, self.digest, self.nrows, self.columns = name, digest, nrows, columns
+
+    def frame(self) -> pd.DataFrame:
+        """A DataFrame over the mapped columns (text columns as categoricals, built on demand)."""
+        return pd.DataFrame({c.name: c.series() for c in self.columns})
+
+    def nbytes(self) -> int:
+        return sum(c.data.nbytes for c in self.columns)
+
+
+def from_frame(name: str, df: pd.DataFrame, digest: str = "") -> Table:
+    """In-memory Table for an already loaded frame (same encoding as the on-disk cache)."""
+    cols = []
+    for col in df.columns:
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            cols.append(Column(str(col), s.cat.codes.to_numpy(dtype=np.int32),
+                               np.asarray(s.cat.categories.astype(object), dtype=object)))
+        elif pd.api.types.is_numeric_dtype(s.dtype) and not pd.api.types.is_bool_dtype(s.dtype):
+            cols.append(Column(str(col), s.to_numpy()))
+        else:
+            codes, uniques = pd.factorize(s, use_na_sentinel=True)
+            cols.append(Column(str(col), codes.astype(np.int32), np.asarray(uniques, dtype=object)))
+    return Table(name, digest, len(df), cols)
+
+
+# ---------- Conversion ----------
+class _Encoder:
+    """Accumulates one column across CSV chunks; text values get stable global codes."""
+    __slots__ = ("name", "text", "parts", "index", "values")
+
+    def __init__(self, name: str, text: bool):
+        self.name, self.text = name, text
+        self.parts: List[np.ndarray] = []
+        self.index: Dict[object, int] = {}
+        self.values: List[object] = []
+
+    def add(self, s: pd.Series):
+        if not self.text:
+            self.parts.append(s.to_numpy())
+            return
+        codes, uniques = pd.factorize(s, use_na_sentinel=True)
+        remap = np.empty(len(uniques) + 1, dtype=np.int32)
+        remap[-1] = -1  # factorize's NA sentinel indexes the last slot
+        for i, v in enumerate(uniques):
+            code = self.index.get(v)
+            if code is None:
+                code = self.index[v] = len(self.values)
+                self.values.append(v)
+            remap[i] = code
+        self.parts.append(remap[codes])
+
+    def finish(self) -> np.ndarray:
+        if not self.parts:
+            return np.empty(0, dtype=np.int32 if self.text else np.float64)
+        return np.concatenate(self.parts)
+
+
+def _is_text(dtype: Optional[str], sample: pd.Series) -> bool:
+    if dtype is not None:
+        return dtype in _TEXT_DTYPES
+    return not pd.api.types.is_numeric_dtype(sample.dtype) or pd.api.types.is_bool_dtype(sample.dtype)
+
+
+def _dict_value(v):
+    return v.item() if isinstance(v, np.generic) else v
+
+
+def convert(name: str, path: pathlib.Path, digest: str, schema: Optional[Dict[str, str]] = None) -> pathlib.Path:
+    """Convert CSV `path` into the cache directory for `digest` (no-op if it already exists)."""
+    out = _dir_for(name, digest)
+    if (out / "manifest.json").exists():
+        return out
+    schema = schema or {}
+    # text columns are read as plain strings and encoded here, so chunks share one dictionary
+    read_types = {c: (str if t in _TEXT_DTYPES else t) for c, t in schema.items()}
+    encoders: List[_Encoder] = []
+    for chunk in pd.read_csv(path, dtype=read_types, chunksize=CHUNK_ROWS):
+        if not encoders:
+            encoders = [_Encoder(str(c), _is_text(schema.get(c), chunk[c])) for c in chunk.columns]
+        for enc, col in zip(encoders, chunk.columns):
+            enc.add(chunk[col])
+    if not encoders:  # header-only file
+        encoders = [_Encoder(str(c), _is_text(schema.get(c), pd.Series([], dtype=object)))
+                    for c in pd.read_csv(path, nrows=0).columns]
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = pathlib.Path(tempfile.mkdtemp(prefix=f".{out.name}.", dir=CACHE_DIR))
+    try:
+        manifest = {"format": FORMAT, "name": name, "sha256": digest, "rows": 0, "columns": []}
+        for i, enc in enumerate(encoders):
+            data = enc.finish()
+            manifest["rows"] = len(data)
+            np.save(tmp / f"{i}.npy", data, allow_pickle=False)
+            entry = {"name": enc.name, "file": f"{i}.npy", "dtype": str(data.dtype)}
+            if enc.text:
+                entry["dictionary"] = f"{i}.dict.json"
+                with open(tmp / entry["dictionary"], "w", encoding="utf-8") as f:
+                    json.dump([_dict_value(v) for v in enc.values], f)
+            manifest["columns"].append(entry)
+        with open(tmp / "manifest.json", "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        try:
+            os.rename(tmp, out)  # atomic; fails if another worker finished first
+        except OSError:
+            if not (out / "manifest.json").exists():
+                raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    _prune(name, keep=out)
+    return out
+
+
+def _dir_for(name: str, digest: str) -> pathlib.Path:
+    return CACHE_DIR / f"{name}-{digest[:16]}"
+
+
+def _prune(name: str, keep: pathlib.Path):
+    """Drop caches of older versions; mapped files stay readable until their users let go."""
+    for d in CACHE_DIR.glob(f"{name}-*"):
+        if d != keep and d.is_dir() and d.name[len(name) + 1:].isalnum():
+            shutil.rmtree(d, ignore_errors=True)
+
+
+def load(name: str, digest: str) -> Optional[Table]:
+    """Map a converted dataset, or None if it has not been converted (or the cache is stale)."""
+    d = _dir_for(name, digest)
+    try:
+        with open(d / "manifest.json", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format") != FORMAT or manifest.get("sha256") != digest:
+        return None
+    cols = []
+    for entry in manifest["columns"]:
+        data = np.load(d / entry["file"], mmap_mode="r", allow_pickle=False)
+        dictionary = None
+        if "dictionary" in entry:
+            with open(d / entry["dictionary"], encoding="utf-8") as f:
+                dictionary = np.array(json.load(f), dtype=object)
+        cols.append(Column(entry["name"], data, dictionary))
+    return Table(name, digest, manifest["rows"], cols)
+
+
+def open_table(name: str, path: pathlib.Path, digest: str, schema: Optional[Dict[str, str]] = None) -> Table:
+    """The mapped table for `path` at content hash `digest`, converting the CSV first if needed."""
+    table = load(name, digest)
+    if table is None:
+        convert(name, path, digest, schema)
+        table = load(name, digest)
+    return table
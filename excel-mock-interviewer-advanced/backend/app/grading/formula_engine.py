@@ -0,0 +1,615 @@
+# Excel formula engine for grading formula answers.
+# Formulas parse into tuple ASTs (cached by normalized text) and evaluate against the
+# question's dataset laid out as a sheet: row 1 = headers, data from row 2, columns
+# A, B, C... in dataset order. Ranges become numpy columns, so lookups/aggregations are vectorized.
+import re, fnmatch, threading
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.grading import columnar
+
+
+class FormulaError(Exception):
+    """Formula cannot be parsed or evaluated (maps to an Excel error value)."""
+
+
+# ---------- Tokenizer ----------
+_TOKEN = re.compile(
+    r"""
+    (?P<ws>\s+)
+  | (?P<str>"(?:[^"]|"")*")
+  | (?P<ref>\$?[A-Z]{1,3}\$?[0-9]+(?::\$?[A-Z]{1,3}\$?[0-9]+)?|\$?[A-Z]{1,3}:\$?[A-Z]{1,3})(?![A-Z0-9_.(])
+  | (?P<num>[0-9]+(?:\.[0-9]*)?(?:E[+-]?[0-9]+)?|\.[0-9]+)
+  | (?P<func>[A-Z][A-Z0-9_.]*)\s*\(
+  | (?P<bool>TRUE|FALSE)(?![A-Z0-9_.(])
+  | (?P<op><>|<=|>=|[-+*/^&=<>(),;])
+    """,
+    re.VERBOSE | re.IGNORECASE,
+)
+
+
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    out, pos = [], 0
+    while pos < len(text):
+        m = _TOKEN.match(text, pos)
+        if not m:
+            raise FormulaError(f"unexpected input at '{text[pos:pos + 12]}'")
+        pos = m.end()
+        kind = m.lastgroup
+        if kind == "ws":
+            continue
+        val = m.group(kind)
+        if kind == "op" and val == ";":
+            val = ","  # locales that separate arguments with ';'
+        out.append((kind, val if kind == "str" else val.upper()))
+    return out
+
+
+def normalize(formula: str) -> str:
+    """Canonical formula text: no leading '=', no whitespace or '$', upper-cased outside strings."""
+    text = (formula or "").strip()
+    if text.startswith("="):
+        text = text[1:]
+    parts = re.split(r'("(?:[^"]|"")*")', text)
+    return "".join(p if i % 2 else re.sub(r"[\s$]+", "", p).upper() for i, p in enumerate(parts))
+
+
+# ---------- Parser ----------
+def _col_index(letters: str) -> int:
+    n = 0
+    for ch in letters:
+        n = n * 26 + (ord(ch) - 64)
+    return n - 1
+
+
+def _ref_node(ref: str):
+    ref = ref.replace("$", "")
+    a, _, b = ref.partition(":")
+    b = b or a
+    ma, mb = re.fullmatch(r"([A-Z]+)([0-9]*)", a), re.fullmatch(r"([A-Z]+)([0-9]*)", b)
+    c0, c1 = _col_index(ma.group(1)), _col_index(mb.group(1))
+    r0 = int(ma.group(2)) if ma.group(2) else None
+    r1 = int(mb.group(2)) if mb.group(2) else None
+    if (r0 is None) != (r1 is None):
+        raise FormulaError(f"invalid range {ref}")
+    if r0 is not None and r0 > r1:
+        r0, r1 = r1, r0
+    return ("range", min(c0, c1), r0, max(c0, c1), r1)
+
+
+class _Parser:
+    # binary operator precedence (higher binds tighter)
+    _PREC = {"=": 1, "<>": 1, "<": 1, ">": 1, "<=": 1, ">=": 1, "&": 2, "+": 3, "-": 3, "*": 4, "/": 4, "^": 5}
+
+    def __init__(self, tokens):
+        self.toks = tokens
+        self.i = 0
+
+    def peek(self):
+        return self.toks[self.i] if self.i < len(self.toks) else (None, None)
+
+    def take(self, val=None):
+        tok = self.peek()
+        if tok[0] is None or (val is not None and tok[1] != val):
+            raise FormulaError(f"expected '{val}'" if val else "unexpected end of formula")
+        self.i += 1
+        return tok
+
+    def expr(self, min_prec=1):
+        left = self.unary()
+        while True:
+            kind, val = self.peek()
+            prec = self._PREC.get(val) if kind == "op" else None
+            if prec is None or prec < min_prec:
+                return left
+            self.i += 1
+            left = ("bin", val, left, self.expr(prec + 1))
+
+    def unary(self):
+        kind, val = self.peek()
+        if kind == "op" and val in ("-", "+"):
+            self.i += 1
+            node = self.unary()
+            return ("neg", node) if val == "-" else node
+        return self.primary()
+
+    def primary(self):
+        kind, val = self.take()
+        if kind == "num":
+            return ("num", float(val))
+        if kind == "str":
+            return ("str", val[1:-1].replace('""', '"'))
+        if kind == "bool":
+            return ("bool", val == "TRUE")
+        if kind == "ref":
+            return _ref_node(val)
+        if kind == "func":
+            args = []
+            if self.peek() != ("op", ")"):
+                args.append(self.expr())
+                while self.peek() == ("op", ","):
+                    self.i += 1
+                    args.append(self.expr())
+            self.take(")")
+            return ("call", val, tuple(args))
+        if (kind, val) == ("op", "("):
+            node = self.expr()
+            self.take(")")
+            return node
+        raise FormulaError(f"unexpected '{val}'")
+
+
+@lru_cache(maxsize=4096)
+def _parse_normalized(text: str):
+    p = _Parser(_tokenize(text))
+    node = p.expr()
+    if p.i != len(p.toks):
+        raise FormulaError(f"unexpected '{p.toks[p.i][1]}'")
+    return node
+
+
+def parse(formula: str):
+    """AST for an Excel formula (with or without the leading '='). Cached by normalized text."""
+    text = normalize(formula)
+    if not text:
+        raise FormulaError("empty formula")
+    return _parse_normalized(text)
+
+
+def walk(node):
+    yield node
+    if node[0] == "call":
+        for a in node[2]:
+            yield from walk(a)
+    elif node[0] == "bin":
+        yield from walk(node[2])
+        yield from walk(node[3])
+    elif node[0] == "neg":
+        yield from walk(node[1])
+
+
+def functions(node) -> set:
+    return {n[1] for n in walk(node) if n[0] == "call"}
+
+
+def has_ranges(node) -> bool:
+    return any(n[0] == "range" for n in walk(node))
+
+
+# ---------- Sheet ----------
+class _SheetColumn:
+    """Views of one dataset column over sheet rows. Numeric columns slice the (mapped) array;
+    text columns are dictionary codes, so predicates run once per distinct value."""
+    __slots__ = ("header", "data", "dictionary", "_folded", "_dict_num", "_codes")
+
+    def __init__(self, col: columnar.Column):
+        self.header = col.name
+        self.data = np.asarray(col.data)  # plain ndarray view of the mapping: cheaper to slice than np.memmap
+        self.dictionary = col.dictionary
+        self._folded = self._dict_num = self._codes = None
+
+    def _body(self, r0: int, r1: int):
+        return self.data[max(r0, 2) - 2:r1 - 1]  # sheet row 2 is data index 0
+
+    def _with_header(self, r0: int, head, body: np.ndarray) -> np.ndarray:
+        if r0 > 1:
+            return body
+        out = np.empty(len(body) + 1, dtype=body.dtype)
+        out[0] = head
+        out[1:] = body
+        return out
+
+    def folded(self) -> np.ndarray:
+        if self._folded is None:  # + a trailing slot that code -1 (blank) indexes
+            self._folded = np.array([str(v).casefold() for v in self.dictionary] + [""], dtype=object)
+        return self._folded
+
+    def num(self, r0: int, r1: int) -> np.ndarray:
+        body = self._body(r0, r1)
+        if self.dictionary is not None:
+            if self._dict_num is None:
+                self._dict_num = np.append(pd.to_numeric(pd.Series(self.dictionary, dtype=object),
+                                                         errors="coerce").to_numpy(dtype=float), np.nan)
+            body = self._dict_num[body]
+        else:
+            body = np.asarray(body, dtype=float)
+        return self._with_header(r0, np.nan, body)
+
+    def txt(self, r0: int, r1: int) -> np.ndarray:
+        body = self._body(r0, r1)
+        if self.dictionary is not None:
+            body = self.folded()[body]
+        else:
+            body = np.array([str(v).casefold() for v in body.tolist()], dtype=object)
+        return self._with_header(r0, self.header.casefold(), body)
+
+    def text_mask(self, r0: int, r1: int, pred) -> np.ndarray:
+        """pred(case-folded text) for every cell, evaluated per distinct value when encoded.
+        A str `pred` means equality and is answered from a code index."""
+        if isinstance(pred, str):
+            if self.dictionary is None:
+                return self.txt(r0, r1) == pred
+            if self._codes is None:
+                codes: Dict[str, List[int]] = {}
+                for i, t in enumerate(self.folded()[:-1]):
+                    codes.setdefault(t, []).append(i)
+                self._codes = codes
+            hit = self._codes.get(pred, []) + ([-1] if pred == "" else [])
+            body = self._body(r0, r1)
+            if not hit:
+                mask = np.zeros(len(body), dtype=bool)
+            else:
+                mask = body == hit[0] if len(hit) == 1 else np.isin(body, hit)
+            return self._with_header(r0, self.header.casefold() == pred, mask)
+        if self.dictionary is None:
+            txt = self.txt(r0, r1)
+            return np.fromiter((pred(t) for t in txt), dtype=bool, count=len(txt))
+        lut = np.fromiter((pred(t) for t in self.folded()), dtype=bool, count=len(self.folded()))
+        lut[-1] = pred("")
+        return self._with_header(r0, pred(self.header.casefold()), lut[self._body(r0, r1)])
+
+    def cell(self, r: int):
+        if r == 1:
+            return self.header
+        v = self.data[r - 2]
+        if self.dictionary is None:
+            return v
+        return self.dictionary[v] if v >= 0 else np.nan
+
+
+class Sheet:
+    """A dataset laid out as columns: row 1 holds the headers, data starts at row 2."""
+    __slots__ = ("nrows", "cols")
+
+    def __init__(self, table: columnar.Table):
+        self.nrows = table.nrows + 1  # + header row
+        self.cols = [_SheetColumn(c) for c in table.columns]
+
+
+class _Ref:
+    """A resolved rectangular range (0-based column indexes, 1-based rows, clipped to used rows)."""
+    __slots__ = ("sheet", "c0", "c1", "r0", "r1", "rows")
+
+    def __init__(self, sheet: Sheet, c0, r0, c1, r1):
+        if c1 >= len(sheet.cols):
+            raise FormulaError("range refers to an empty column")
+        self.sheet, self.c0, self.c1 = sheet, c0, c1
+        self.r0 = 1 if r0 is None else r0
+        self.r1 = sheet.nrows if r1 is None else r1
+        self.rows = self.r1 - self.r0 + 1  # requested height (used for size checks)
+
+    def _single(self) -> _SheetColumn:
+        if self.c0 != self.c1:
+            raise FormulaError("expected a single-column range")
+        return self.sheet.cols[self.c0]
+
+    def _padded(self, col: np.ndarray, blank) -> np.ndarray:
+        if len(col) < self.rows:  # rows beyond the data are blank cells
+            col = np.concatenate([col, np.full(self.rows - len(col), blank, dtype=col.dtype)])
+        return col
+
+    def vector(self, view: str = "num"):
+        col = self._single()
+        r1 = min(self.r1, self.sheet.nrows)
+        if view == "num":
+            return self._padded(col.num(self.r0, r1), np.nan)
+        return self._padded(col.txt(self.r0, r1), "")
+
+    def text_mask(self, pred) -> np.ndarray:
+        """pred(case-folded text), or equality with a case-folded str, per cell of a single-column range."""
+        col = self._single()
+        blank = pred == "" if isinstance(pred, str) else pred("")
+        return self._padded(col.text_mask(self.r0, min(self.r1, self.sheet.nrows), pred), blank)
+
+    def cell(self, row: int, col: int = 1):
+        if not (1 <= row <= self.rows and 1 <= col <= self.c1 - self.c0 + 1):
+            raise FormulaError("#REF! index out of range")
+        r = self.r0 + row - 1
+        if r > self.sheet.nrows:
+            return 0.0
+        return self.sheet.cols[self.c0 + col - 1].cell(r)
+
+
+# ---------- Evaluator ----------
+_CRIT = re.compile(r"^(<>|<=|>=|=|<|>)?(.*)$", re.DOTALL)
+
+
+def _num(v) -> float:
+    if isinstance(v, (bool, np.bool_)):
+        return float(v)
+    if isinstance(v, (int, float, np.integer, np.floating)):
+        return float(v)
+    try:
+        return float(str(v))
+    except ValueError:
+        raise FormulaError(f"#VALUE! '{v}' is not a number")
+
+
+def _scalar(v):
+    if isinstance(v, _Ref):
+        if v.rows != 1 or v.c0 != v.c1:
+            raise FormulaError("expected a single cell")
+        return v.cell(1)
+    if isinstance(v, np.ndarray):
+        if v.size != 1:
+            raise FormulaError("expected a single value")
+        return v.reshape(-1)[0]
+    return v
+
+
+def _array(v, view: str = "num") -> np.ndarray:
+    if isinstance(v, _Ref):
+        return v.vector(view)
+    if isinstance(v, np.ndarray):
+        return v.astype(float) if v.dtype == bool else v
+    return np.array([v if view == "txt" else _num(v)], dtype=object if view == "txt" else float)
+
+
+def _criteria_mask(rng, crit) -> np.ndarray:
+    """Vectorized SUMIFS-style criteria match of `crit` against `rng`."""
+    if not isinstance(rng, _Ref):
+        raise FormulaError("criteria range must be a range")
+    crit = _scalar(crit)
+    if isinstance(crit, (int, float, np.integer, np.floating)) and not isinstance(crit, bool):
+        return rng.vector("num") == float(crit)
+    op, operand = _CRIT.match(str(crit)).groups()
+    op = op or "="
+    try:
+        value = float(operand)
+        nums = rng.vector("num")
+        with np.errstate(invalid="ignore"):
+            return {"=": nums == value, "<>": nums != value, "<": nums < value,
+                    ">": nums > value, "<=": nums <= value, ">=": nums >= value}[op]
+    except ValueError:
+        pass
+    operand = operand.casefold()
+    if op in ("=", "<>"):
+        if any(ch in operand for ch in "*?"):
+            rx = re.compile(fnmatch.translate(operand), re.DOTALL)
+            hit = rng.text_mask(lambda t: rx.match(t) is not None)
+        else:
+            hit = rng.text_mask(operand)
+        return hit if op == "=" else ~hit
+    raise FormulaError(f"unsupported criteria '{crit}'")
+
+
+def _same_height(*refs):
+    heights = {r.rows for r in refs}
+    if len(heights) > 1:
+        raise FormulaError("#VALUE! ranges have different sizes")
+
+
+def _ifs(args, with_target: bool):
+    target, pairs = (args[0], args[1:]) if with_target else (None, args)
+    if not pairs or len(pairs) % 2:
+        raise FormulaError("criteria must come in range/criteria pairs")
+    refs = [pairs[i] for i in range(0, len(pairs), 2)]
+    if not all(isinstance(r, _Ref) for r in refs) or (target is not None and not isinstance(target, _Ref)):
+        raise FormulaError("SUMIFS/COUNTIFS arguments must be ranges")
+    _same_height(*refs, *([target] if target is not None else []))
+    mask = np.ones(refs[0].rows, dtype=bool)
+    for i in range(0, len(pairs), 2):
+        mask &= _criteria_mask(pairs[i], pairs[i + 1])
+    return target, mask
+
+
+def _fn_sumifs(args):
+    target, mask = _ifs(args, True)
+    return float(np.nansum(target.vector("num")[mask]))
+
+
+def _fn_countifs(args):
+    _, mask = _ifs(args, False)
+    return float(mask.sum())
+
+
+def _fn_averageifs(args):
+    target, mask = _ifs(args, True)
+    vals = target.vector("num")[mask]
+    vals = vals[~np.isnan(vals)]
+    if not len(vals):
+        raise FormulaError("#DIV/0! no matching cells")
+    return float(vals.mean())
+
+
+def _fn_sumif(args):
+    if len(args) not in (2, 3):
+        raise FormulaError("SUMIF takes 2 or 3 arguments")
+    return _fn_sumifs([args[2] if len(args) == 3 else args[0], args[0], args[1]])
+
+
+def _fn_countif(args):
+    return _fn_countifs(args)
+
+
+def _fn_sum(args):
+    return float(sum(np.nansum(_array(a)) for a in args))
+
+
+def _fn_sumproduct(args):
+    arrays = [_array(a) for a in args]
+    if len({len(a) for a in arrays}) > 1:
+        raise FormulaError("#VALUE! arrays have different sizes")
+    return float(np.nansum(np.prod(np.vstack(arrays), axis=0)))
+
+
+def _exact_match(value, arr_arg) -> np.ndarray:
+    value = _scalar(value)
+    if isinstance(value, str):
+        if isinstance(arr_arg, _Ref):
+            return arr_arg.text_mask(value.casefold())
+        return _array(arr_arg, "txt") == value.casefold()
+    arr = _array(arr_arg)
+    with np.errstate(invalid="ignore"):
+        return arr.astype(float) == _num(value)
+
+
+def _fn_match(args):
+    if len(args) not in (2, 3):
+        raise FormulaError("MATCH takes 2 or 3 arguments")
+    mode = _num(_scalar(args[2])) if len(args) == 3 else 1.0
+    if mode != 0:
+        raise FormulaError("only exact MATCH (match_type 0) is supported")
+    hits = np.flatnonzero(_exact_match(args[0], args[1]))
+    if not len(hits):
+        raise FormulaError("#N/A no match")
+    return float(hits[0] + 1)
+
+
+def _fn_index(args):
+    if len(args) not in (2, 3) or not isinstance(args[0], _Ref):
+        raise FormulaError("INDEX needs a range and a row number")
+    ref = args[0]
+    row = int(_num(_scalar(args[1])))
+    col = int(_num(_scalar(args[2]))) if len(args) == 3 else 1
+    if ref.rows == 1 and len(args) == 2 and ref.c1 > ref.c0:
+        row, col = 1, row  # INDEX over a single row
+    return ref.cell(row, col)
+
+
+def _fn_xlookup(args):
+    if not 3 <= len(args) <= 5:
+        raise FormulaError("XLOOKUP takes 3 to 5 arguments")
+    if len(args) == 5 and _num(_scalar(args[4])) != 0:
+        raise FormulaError("only exact XLOOKUP (match_mode 0) is supported")
+    hit = _exact_match(args[0], args[1])
+    ret = args[2]
+    height = ret.rows if isinstance(ret, _Ref) else len(_array(ret))
+    if len(hit) != height:
+        raise FormulaError("#VALUE! lookup and return arrays have different sizes")
+    idx = np.flatnonzero(hit)
+    if not len(idx):
+        if len(args) >= 4:
+            return _scalar(args[3])
+        raise FormulaError("#N/A no match")
+    if isinstance(ret, _Ref):
+        return ret.cell(int(idx[0]) + 1)
+    return _array(ret)[idx[0]]
+
+
+_FUNCS = {
+    "SUMIFS": _fn_sumifs,
+    "COUNTIFS": _fn_countifs,
+    "AVERAGEIFS": _fn_averageifs,
+    "SUMIF": _fn_sumif,
+    "COUNTIF": _fn_countif,
+    "SUM": _fn_sum,
+    "SUMPRODUCT": _fn_sumproduct,
+    "MATCH": _fn_match,
+    "INDEX": _fn_index,
+    "XLOOKUP": _fn_xlookup,
+}
+
+
+def _text_array(v) -> np.ndarray:
+    if isinstance(v, _Ref):
+        return v.vector("txt")  # already case-folded
+    if isinstance(v, np.ndarray):
+        return np.array([str(x).casefold() for x in v], dtype=object)
+    return np.array([str(v).casefold()], dtype=object)
+
+
+def _as_text(v) -> str:
+    """A value as Excel's & shows it: whole numbers without ".0", blanks as ""."""
+    if isinstance(v, (bool, np.bool_)):
+        return "TRUE" if v else "FALSE"
+    if isinstance(v, (float, np.floating)):
+        if v != v:
+            return ""
+        return str(int(v)) if float(v).is_integer() else repr(float(v))
+    return str(v)
+
+
+def _concat(a, b):
+    """a & b; element-wise over ranges/arrays, a one-value side is repeated (e.g. B:B&C:C as a lookup key)."""
+    def many(v):
+        return (isinstance(v, _Ref) and (v.rows > 1 or v.c0 != v.c1)) or (isinstance(v, np.ndarray) and v.size != 1)
+    if not many(a) and not many(b):
+        return _as_text(_scalar(a)) + _as_text(_scalar(b))
+
+    def texts(v) -> np.ndarray:
+        # case-folded like range text: an array result only feeds comparisons and lookups
+        if isinstance(v, _Ref):
+            return v.vector("txt") if many(v) else np.array([_as_text(v.cell(1)).casefold()], dtype=object)
+        vals = v.reshape(-1) if isinstance(v, np.ndarray) else [v]
+        return np.array([_as_text(x).casefold() for x in vals], dtype=object)
+    la, lb = texts(a), texts(b)
+    if len(la) != len(lb) and 1 not in (len(la), len(lb)):
+        raise FormulaError("#VALUE! arrays have different sizes")
+    return la + lb
+
+
+def _compare(op, a, b):
+    if op in ("=", "<>") and isinstance(b, str) and isinstance(a, _Ref) and a.c0 == a.c1:
+        hit = a.text_mask(b.casefold())  # e.g. (B:B="Kivell"), per distinct value
+        return hit if op == "=" else ~hit
+    if isinstance(a, str) or isinstance(b, str):
+        la, lb = _text_array(a), _text_array(b)
+    else:
+        la, lb = _array(a).astype(float), _array(b).astype(float)
+    with np.errstate(invalid="ignore"):
+        return {"=": la == lb, "<>": la != lb, "<": la < lb, ">": la > lb, "<=": la <= lb, ">=": la >= lb}[op]
+
+
+def _eval(node, sheet: Sheet):
+    kind = node[0]
+    if kind in ("num", "str", "bool"):
+        return node[1]
+    if kind == "range":
+        return _Ref(sheet, node[1], node[2], node[3], node[4])
+    if kind == "neg":
+        v = _eval(node[1], sheet)
+        return -_array(v).astype(float) if isinstance(v, (_Ref, np.ndarray)) else -_num(v)
+    if kind == "call":
+        name = node[1]
+        if name == "IFERROR":
+            if len(node[2]) != 2:
+                raise FormulaError("IFERROR takes 2 arguments")
+            try:
+                return _eval(node[2][0], sheet)
+            except FormulaError:
+                return _eval(node[2][1], sheet)
+        fn = _FUNCS.get(name)
+        if fn is None:
+            raise FormulaError(f"unsupported function {name}")
+        return fn([_eval(a, sheet) for a in node[2]])
+    if kind == "bin":
+        op, a, b = node[1], _eval(node[2], sheet), _eval(node[3], sheet)
+        if op in ("=", "<>", "<", ">", "<=", ">="):
+            return _compare(op, a, b)
+        if op == "&":
+            return _concat(a, b)
+        la, lb = _array(a).astype(float), _array(b).astype(float)
+        if len(la) != len(lb) and 1 not in (len(la), len(lb)):
+            raise FormulaError("#VALUE! arrays have different sizes")
+        with np.errstate(invalid="ignore", divide="ignore"):
+            res = {"+": la + lb, "-": la - lb, "*": la * lb, "/": la / lb, "^": la ** lb}[op]
+        return res
+    raise FormulaError("unsupported expression")
+
+
+_SHEETS: Dict[str, Tuple[str, Sheet]] = {}  # dataset name -> (version, sheet)
+_SHEETS_LOCK = threading.Lock()
+
+
+def sheet_for(name: str, data, version: str) -> Sheet:
+    """Sheet view of dataset `name` (a columnar.Table or DataFrame), rebuilt only when its version changes."""
+    with _SHEETS_LOCK:
+        cached = _SHEETS.get(name)
+        if cached is None or cached[0] != version:
+            table = columnar.from_frame(name, data) if isinstance(data, pd.DataFrame) else data
+            cached = _SHEETS[name] = (version, Sheet(table))
+        return cached[1]
+
+
+def evaluate(node, sheet: Sheet) -> Any:
+    """Evaluate a parsed formula to a scalar (float or text)."""
+    v = _scalar(_eval(node, sheet))
+    if isinstance(v, (np.bool_, bool)):
+        return bool(v)
+    if isinstance(v, (np.integer, np.floating, int, float)):
+        return float(v)
+    return v
@@ -1,21 +1,132 @@
-import re
-from typing import Tuple
-SUMIFS = re.compile(r"=\s*SUMIFS\(", re.IGNORECASE)
-#XLOOKUP = re.compile(r"=\s*XLOOKUP\(", re.IGNORECASE)
-#XLOOKUP = re.compile(r"=\s*XLOOKUP\s*\(", re.IGNORECASE)
-XLOOKUP    = re.compile(r"=\s*XLOOKUP\s*\(", re.IGNORECASE)
+import re, math, threading
+from typing import Dict, List, Tuple
+from app.grading import answer_keys, formula_engine
+from app.grading.formula_engine import FormulaError
+from app.questions.bank import all_meta, generation, on_reload
 
-#INDEX_MATCH = re.compile(r"=\s*INDEX\([^)]*MATCH\(", re.IGNORECASE)
-#INDEX_MATCH = re.compile(r"=\s*INDEX\s*\([^)]*MATCH\s*\(", re.IGNORECASE)
-INDEX_MATCH = re.compile(r"=\s*INDEX\s*\([^)]*MATCH\s*\(", re.IGNORECASE)
+# Per-question rules from bank.json, matched against "=" + the normalized formula (no spaces/'$',
+# upper-case outside strings):
+#   "formula_rules": {"rejected":  [{"pattern", "score"=0, "feedback"}],   checked before evaluation
+#                     "accepted":  [{"pattern", "score"=max, "feedback"}], if given, a correct formula must match one
+#                     "penalized": [{"pattern" or "function", "penalty", "label", "note"}],
+#                     "unaccepted_score": 2,
+#                     "examples":  ["=formula", {"formula", "score"=max}]}   known answers, graded at warm-up
+# Legacy "accepted_patterns" / "penalized_functions" are folded in. Every question's rules compile
+# once per bank load into one regex of optional lookaheads, so a single match() finds all of them.
+UNACCEPTED_SCORE=2.0
+
+class _Rules:
+    __slots__=("rx","rejected","accepted","penalized","unaccepted","error")
+    def __init__(self): self.rx=None; self.rejected=[]; self.accepted=[]; self.penalized=[]; self.unaccepted=UNACCEPTED_SCORE; self.error=None
+    def hits(self,subject:str)->set:
+        if self.rx is None: return set()
+        return {g for g,v in self.rx.match(subject).groupdict().items() if v is not None}
+
+def _function_pattern(name:str)->str: return r"(?<![A-Z0-9_.])"+re.escape(name.upper())+r"\("
+
+def _compile(q:dict)->_Rules:
+    r=_Rules(); spec=dict(q.get('formula_rules') or {}); parts=[]
+    accepted=list(spec.get('accepted') or [])+[{'pattern':p} for p in q.get('accepted_patterns') or []]
+    penalized=list(spec.get('penalized') or [])+[{'function':fn,'penalty':p} for fn,p in (q.get('penalized_functions') or {}).items()]
+    try:
+        for kind,rules in (('rejected',spec.get('rejected') or []),('accepted',accepted),('penalized',penalized)):
+            for i,rule in enumerate(rules):
+                g=f"{kind[0]}{i}"; pat=rule.get('pattern') or _function_pattern(rule['function'])
+                re.compile(pat)  # report a bad pattern on its own, not as part of the combined regex
+                parts.append(f"(?:(?=.*?(?P<{g}>{pat}))|)")
+                if kind=='rejected': r.rejected.append((g,float(rule.get('score',0)),rule.get('feedback') or "Formula uses an approach this question does not allow."))
+                elif kind=='accepted': r.accepted.append((g,None if rule.get('score') is None else float(rule['score']),rule.get('feedback')))
+                else: r.penalized.append((g,float(rule.get('penalty',1)),rule.get('label') or rule.get('function') or pat,
+                                          rule.get('note',"a simpler function exists" if 'function' in rule else None)))
+        r.unaccepted=float(spec.get('unaccepted_score',UNACCEPTED_SCORE))
+        if parts: r.rx=re.compile("".join(parts),re.DOTALL|re.IGNORECASE)
+    except (re.error,KeyError,TypeError,ValueError) as e: r.error=f"{type(e).__name__}: {e}"
+    return r
+
+_LOCK=threading.Lock(); _RULES:Dict[str,_Rules]={}; _GEN=[0]
+
+@on_reload
+def _compile_all():
+    """Compile the rules of every formula question in the bank (runs on each hot reload)."""
+    gen=generation(); rules={q['id']:_compile(q) for q in all_meta() if q.get('kind')=='formula'}
+    with _LOCK: _RULES.clear(); _RULES.update(rules); _GEN[0]=gen
+
+def rules_for(q:dict)->_Rules:
+    if _GEN[0]!=generation(): _compile_all()
+    r=_RULES.get(q.get('id'))
+    if r is None:  # question not in the bank (e.g. built by a script)
+        r=_compile(q)
+    return r
+
+def warm():
+    """Registry warm-up: answer keys, their perturbed copies, every question's compiled rules and examples."""
+    answer_keys.warm(); _compile_all()
+    for q in all_meta():
+        if q.get('kind')=='formula': answer_keys.perturbed(q.get('eval_key'))
+    _check_examples()
+
+_EXAMPLES:Dict[int,Dict[str,str]]={}  # bank generation -> {qid: failed examples}
+
+def _check_examples()->Dict[str,str]:
+    """Grade every question's "examples"; one that does not earn its stated score (default: max) is a rule error."""
+    gen=generation(); done=_EXAMPLES.get(gen)
+    if done is not None: return done
+    out:Dict[str,str]={}
+    for q in all_meta():
+        if q.get('kind')!='formula': continue
+        bad=[]
+        for ex in (q.get('formula_rules') or {}).get('examples') or []:
+            f,want=(ex,None) if isinstance(ex,str) else (ex.get('formula',''),ex.get('score'))
+            want=float(q.get('max_score',5) if want is None else want)
+            try: got,fb,_=evaluate_formula(q,f)
+            except Exception as e: got,fb=None,f"{type(e).__name__}: {e}"
+            if got is None or not math.isclose(got,want): bad.append(f"example {f} scored {'error' if got is None else f'{got:g}'}, expected {want:g} ({fb})")
+        if bad: out[q['id']]="; ".join(bad)
+    with _LOCK: _EXAMPLES.clear(); _EXAMPLES[gen]=out
+    return out
+
+def rule_errors()->Dict[str,str]:
+    if _GEN[0]!=generation(): _compile_all()
+    with _LOCK: errors={qid:r.error for qid,r in _RULES.items() if r.error}
+    for qid,msg in _check_examples().items(): errors[qid]=f"{errors[qid]}; {msg}" if qid in errors else msg
+    return errors
+
+def _matches(got, exp)->bool:
+    if isinstance(exp,float):
+        try: return math.isclose(float(got),exp,rel_tol=1e-9,abs_tol=1e-6)
+        except (TypeError,ValueError): return False
+    return str(got).casefold()==str(exp).casefold()
 
 def evaluate_formula(q:dict, f:str)->Tuple[float,str,bool]:
     f=(f or '').strip(); mx=float(q.get('max_score',5))
     if not f.startswith('='): return 0.0,"Provide a valid Excel formula starting with '='.",False
-    ok=False; efficient=True
-    if q['id']=='q_sumifs_east_pencil': ok = bool(SUMIFS.search(f))
-    if q['id']=='q_lookup_rep_item_price':
-        if XLOOKUP.search(f): ok=True
-        elif INDEX_MATCH.search(f): ok=True; efficient=False
-    if ok: return (mx if efficient else mx-1),"Formula accepted.",True
-    return 2.0,"Formula not recognized as correct for this task. Recheck ranges/criteria.",False
+    rules=rules_for(q)
+    if rules.error: return 2.0,"The rules for this question are invalid; the formula could not be checked.",False
+    hits=rules.hits("="+formula_engine.normalize(f))
+    for g,score,fb in rules.rejected:
+        if g in hits: return score,fb,False
+    key=q.get('eval_key'); name=answer_keys.dataset_for(key)
+    if name is None: return 2.0,"No answer key for this question; the formula could not be checked.",False
+    try: ast=formula_engine.parse(f)
+    except FormulaError as e: return 2.0,f"Could not parse the formula ({e}).",False
+    if not formula_engine.has_ranges(ast): return 2.0,"Formula must compute the result from the data ranges, not hardcode it.",False
+    try:
+        ver=answer_keys.version(name); sheet=formula_engine.sheet_for(name,answer_keys.table(name),ver)
+        got=formula_engine.evaluate(ast,sheet)
+    except FormulaError as e: return 2.0,f"Formula could not be evaluated ({e}). Recheck ranges/criteria.",False
+    if not _matches(got,answer_keys.get(key)): return 2.0,f"Formula evaluates to {got}, which is not the expected result. Recheck ranges/criteria.",False
+    # the right number is not enough: it must also follow the data (see answer_keys.perturbed)
+    for pname,ptable,pexp in answer_keys.perturbed(key):
+        try: pgot=formula_engine.evaluate(ast,formula_engine.sheet_for(pname,ptable,ver))
+        except FormulaError: pgot=None
+        if not _matches(pgot,pexp): return 2.0,"Formula gives the expected number here but does not compute it from the data: use the ranges with every criterion, not fixed values or cells.",False
+    score,fb=mx,"Formula accepted."
+    if rules.accepted:
+        ok=[(mx if s is None else s,msg) for g,s,msg in rules.accepted if g in hits]
+        if not ok: return rules.unaccepted,"Formula gives the right result, but not with the approach this question asks for.",False
+        score,msg=max(ok,key=lambda x:x[0]); fb=msg or fb
+    pen:List[Tuple[str,float,str]]=[(label,p,note) for g,p,label,note in rules.penalized if g in hits]
+    if pen:
+        total=sum(p for _,p,_ in pen); notes=sorted({n for _,_,n in pen if n})
+        return max(0.0,score-total),f"Formula accepted (−{total:g} for {', '.join(sorted(l for l,_,_ in pen))}{''.join('; '+n for n in notes)}).",True
+    return score,fb,True
@@ -0,0 +1,144 @@
+import os, json, hashlib, threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.questions.bank import generation, on_reload
+from app.services import timings
+
+# Cross-candidate memo of grader results, keyed by (question id, question version, normalized
+# answer). The version covers the question's own bank entry and, for dataset-backed questions,
+# the dataset's content hash, so editing either makes old entries unreachable (they then age
+# out of the LRU). Only deterministic results are kept: LLM fallbacks are never cached.
+GRADE_CACHE_MB = float(os.getenv("GRADE_CACHE_MB", "64"))  # 0 disables the cache
+_MAX_BYTES = int(GRADE_CACHE_MB * 1024 * 1024)
+_ENTRY_OVERHEAD = 200  # bytes per entry besides the feedback text (key, tuple, OrderedDict node)
+
+Result = Tuple[float, str, bool]
+
+_LOCK = threading.Lock()
+_CACHE: "OrderedDict[bytes, Tuple[Result, int]]" = OrderedDict()  # key -> (result, size)
+_STATS = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "bytes": 0}
+_QVER: Dict[str, Tuple[int, str]] = {}  # qid -> (bank generation, digest of the question)
+
+
+# ---------- Answer normalization (per kind; None = do not cache) ----------
+def _formula(q: dict, text: Optional[str], table) -> Optional[str]:
+    from app.grading.formula_engine import normalize
+    t = (text or "").strip()
+    return ("=" if t.startswith("=") else "") + normalize(t)  # a missing '=' grades differently
+
+
+def _value(q: dict, text: Optional[str], table) -> Optional[str]:
+    try:
+        return repr(float(str(text).strip()))
+    except ValueError:
+        return None
+
+
+def _table(q: dict, text: Optional[str], table) -> Optional[str]:
+    if not isinstance(table, list):
+        return None
+    try:  # row order is kept: feedback points at row numbers
+        return json.dumps(table, sort_keys=True, separators=(",", ":"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _text(q: dict, text: Optional[str], table) -> Optional[str]:
+    return " ".join((text or "").split()).casefold()
+
+
+_NORMALIZERS = {"formula": _formula, "value": _value, "table": _table, "text": _text}
+
+
+def _dataset_version(q: dict) -> str:
+    key = q.get("eval_key")
+    if not key:
+        return ""
+    from app.grading import answer_keys
+    name = answer_keys.dataset_for(key)
+    return answer_keys.version(name) if name else ""
+
+
+def _question_version(q: dict) -> str:
+    gen, qid = generation(), q.get("id", "")
+    cached = _QVER.get(qid)
+    if cached is None or cached[0] != gen:
+        digest = hashlib.blake2b(json.dumps(q, sort_keys=True, default=str).encode(), digest_size=8).hexdigest()
+        cached = _QVER[qid] = (gen, digest)
+    return cached[1]
+
+
+@on_reload
+def _forget_versions():
+    _QVER.clear()
+
+
+def key(q: dict, text: Optional[str], table, variant: str = "") -> Optional[bytes]:
+    """Cache key for grading this answer to `q`, or None if it should not be cached.
+    `variant` separates graders whose results differ in form (e.g. streamed text feedback)."""
+    if _MAX_BYTES <= 0:
+        return None
+    norm = _NORMALIZERS.get(q.get("kind", "formula"))
+    answer = norm(q, text, table) if norm else None
+    if answer is None:
+        return None
+    h = hashlib.blake2b(digest_size=16)
+    for part in (q.get("id", ""), _question_version(q), _dataset_version(q), answer, variant):
+        h.update(part.encode("utf-8", "surrogatepass"))
+        h.update(b"\0")
+    return h.digest()
+
+
+def _counter(name: str, kind: str) -> timings.Counter:
+    return timings.counter(f"grade_cache_{name}_total", f"Grading cache {name} by question kind", kind=kind)
+
+
+def get(k: bytes, kind: str) -> Optional[Result]:
+    with _LOCK:
+        hit = _CACHE.get(k)
+        if hit is not None:
+            _CACHE.move_to_end(k)
+            _STATS["hits"] += 1
+        else:
+            _STATS["misses"] += 1
+    _counter("hits" if hit is not None else "misses", kind).inc()
+    return hit[0] if hit is not None else None
+
+
+def cacheable(kind: str, result: Result) -> bool:
+    """Text grades are kept only when they came from the LLM (fallbacks are retried next time)."""
+    if kind != "text":
+        return True
+    from app.services import llm
+    return not llm.is_fallback(result[1])
+
+
+def put(k: bytes, kind: str, result: Result):
+    if not cacheable(kind, result):
+        return
+    size = _ENTRY_OVERHEAD + len(result[1])
+    with _LOCK:
+        old = _CACHE.pop(k, None)
+        if old is not None:
+            _STATS["bytes"] -= old[1]
+        _CACHE[k] = (result, size)
+        _STATS["bytes"] += size
+        _STATS["stores"] += 1
+        while _STATS["bytes"] > _MAX_BYTES and _CACHE:
+            _, (_, s) = _CACHE.popitem(last=False)
+            _STATS["bytes"] -= s
+            _STATS["evictions"] += 1
+
+
+def clear():
+    with _LOCK:
+        _CACHE.clear()
+        _STATS["bytes"] = 0
+
+
+def stats() -> Dict[str, Any]:
+    with _LOCK:
+        looked = _STATS["hits"] + _STATS["misses"]
+        return {**_STATS, "entries": len(_CACHE), "max_bytes": _MAX_BYTES,
+                "hit_rate": round(_STATS["hits"] / looked, 4) if looked else None}
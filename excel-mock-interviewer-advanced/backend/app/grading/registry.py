@@ -0,0 +1,144 @@
+import os, time, importlib, threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.grading import grade_cache
+from app.services import timings
+
+# Graders keyed by question kind. Modules are named as "module:function" strings and
+# imported on first use (or by the background warm-up), so a worker that never grades
+# a table never pays for pandas. Every grader is called as fn(q, answer_text, answer_table).
+# A kind may also name a streaming grader, fn(q, answer_text, emit), that reports partial
+# feedback through emit(event, data) while it works (used by POST /answer/stream).
+GRADER_WARM = os.getenv("GRADER_WARM", "background").lower()  # background | eager | lazy
+
+Grader = Callable[[dict, Optional[str], Any], Tuple[float, str, bool]]
+Emit = Callable[[str, dict], None]
+
+
+class _Entry:
+    __slots__ = ("kind", "target", "takes_table", "warm", "stream", "fn", "stream_fn", "hist", "import_ms", "warm_ms",
+                 "error", "lock")
+
+    def __init__(self, kind: str, target: str, takes_table: bool, warm: Optional[str], stream: Optional[str]):
+        self.kind = kind
+        self.target = target            # "package.module:function"
+        self.takes_table = takes_table  # False: called as fn(q, answer_text or "")
+        self.warm = warm                # optional "module:function" run once after import
+        self.stream = stream            # optional streaming grader, "module:function"
+        self.fn: Optional[Grader] = None
+        self.stream_fn = None
+        self.hist = timings.histogram("grader_seconds", "Wall time per grader call",
+                                      grader=target.split(":")[0].rsplit(".", 1)[-1])
+        self.import_ms: Optional[float] = None
+        self.warm_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self.lock = threading.Lock()  # per kind: a slow import never blocks other kinds
+
+
+_LOCK = threading.Lock()
+_ENTRIES: Dict[str, _Entry] = {}
+
+
+def _resolve(target: str):
+    module, _, attr = target.partition(":")
+    return getattr(importlib.import_module(module), attr)
+
+
+def register(kind: str, target: str, takes_table: bool = False, warm: Optional[str] = None,
+             stream: Optional[str] = None):
+    """Grade questions of `kind` with `target` ("module:function"), imported lazily."""
+    with _LOCK:
+        _ENTRIES[kind] = _Entry(kind, target, takes_table, warm, stream)
+
+
+def kinds() -> List[str]:
+    return list(_ENTRIES)
+
+
+def _load(entry: _Entry) -> Grader:
+    with entry.lock:
+        if entry.fn is None:
+            t0 = time.perf_counter()
+            fn = _resolve(entry.target)
+            entry.stream_fn = _resolve(entry.stream) if entry.stream else None
+            entry.import_ms = round((time.perf_counter() - t0) * 1000.0, 2)
+            if entry.warm:
+                t0 = time.perf_counter()
+                _resolve(entry.warm)()
+                entry.warm_ms = round((time.perf_counter() - t0) * 1000.0, 2)
+            entry.fn = fn
+        return entry.fn
+
+
+def grader(kind: str) -> Optional[Grader]:
+    """The raw grading function for `kind` (imported on first call), or None."""
+    entry = _ENTRIES.get(kind)
+    return _load(entry) if entry else None
+
+
+def grade(q: dict, answer_text: Optional[str], answer_table, emit: Optional[Emit] = None) -> Tuple[float, str, bool]:
+    """
+    Dispatch on q["kind"], through the grading cache; raises whatever the grader raises.
+    With `emit`, kinds that have a streaming grader use it (a cache hit is emitted whole).
+    """
+    kind = q.get("kind", "formula")
+    entry = _ENTRIES.get(kind)
+    if entry is None:
+        return 0.0, "Unknown question kind.", False
+    fn = entry.fn or _load(entry)
+    streamed = emit is not None and entry.stream is not None
+    # streamed text feedback is bullet lines, the JSON path's is a fixed note: cached apart
+    key = grade_cache.key(q, answer_text, answer_table, "stream" if streamed else "")
+    if key is not None:
+        hit = grade_cache.get(key, kind)
+        if hit is not None:
+            if streamed:
+                emit("feedback", {"delta": hit[1]})
+            return hit
+    with entry.hist.time():
+        if streamed:
+            result = entry.stream_fn(q, answer_text or "", emit)
+        elif entry.takes_table:
+            result = fn(q, answer_text, answer_table)
+        else:
+            result = fn(q, answer_text or "")
+    if key is not None:
+        grade_cache.put(key, kind, result)
+    return result
+
+
+def warm_all():
+    """Import every grader and run its warm hook; failures are kept for the report."""
+    for entry in list(_ENTRIES.values()):
+        try:
+            _load(entry)
+        except Exception as e:  # surfaces on first real use too
+            entry.error = f"{type(e).__name__}: {e}"
+
+
+def start_warmup() -> Optional[threading.Thread]:
+    """Warm per GRADER_WARM: in a daemon thread (default), inline ("eager") or not at all ("lazy")."""
+    if GRADER_WARM == "lazy":
+        return None
+    if GRADER_WARM == "eager":
+        warm_all()
+        return None
+    t = threading.Thread(target=warm_all, name="grader-warmup", daemon=True)
+    t.start()
+    return t
+
+
+def report() -> Dict[str, Any]:
+    """Per kind: target, whether loaded, import and warm-up time in ms."""
+    return {
+        e.kind: {"target": e.target, "loaded": e.fn is not None, "import_ms": e.import_ms,
+                 "warm_ms": e.warm_ms, "error": e.error}
+        for e in list(_ENTRIES.values())
+    }
+
+
+# ---------- Built-in graders ----------
+register("formula", "app.grading.formula_rules:evaluate_formula", warm="app.grading.formula_rules:warm")
+register("value", "app.grading.pandas_eval:evaluate", takes_table=True, warm="app.grading.answer_keys:warm")
+register("table", "app.grading.pandas_eval:evaluate", takes_table=True, warm="app.grading.answer_keys:warm")
+register("text", "app.services.llm:evaluate_text_with_rubric", stream="app.services.llm:stream_text_with_rubric")
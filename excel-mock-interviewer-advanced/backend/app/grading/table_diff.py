@@ -0,0 +1,250 @@
+# Table comparison for `table` questions.
+# The expected table is prepared once per answer-key value as columns; candidate rows
+# are compared without building DataFrames. Small payloads use plain Python (dict
+# lookup or sorted pairs); large ones switch to numpy: hashed key columns aligned with
+# searchsorted when the question names key columns, otherwise a lexsort of both sides
+# and a vectorized row-by-row compare. Only the first N mismatches are materialized.
+import math, threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+SMALL_ROWS = 2000          # at or below: pure Python path
+DEFAULT_TOLERANCE = 0.005  # same as rounding both sides to 2 decimals
+DEFAULT_MAX_MISMATCHES = 3
+
+
+class TableSpec:
+    """Per-question comparison settings, from the bank's optional "table" block."""
+    __slots__ = ("columns", "key", "tolerance", "max_mismatches")
+
+    def __init__(self, columns: Sequence[str], key: Sequence[str] = (), tolerance: float = DEFAULT_TOLERANCE,
+                 max_mismatches: int = DEFAULT_MAX_MISMATCHES):
+        self.key = tuple(key)
+        self.columns = tuple(columns) + tuple(k for k in self.key if k not in columns)
+        self.tolerance = float(tolerance)
+        self.max_mismatches = int(max_mismatches)
+
+    @classmethod
+    def for_question(cls, q: dict, expected: pd.DataFrame) -> "TableSpec":
+        cfg = q.get("table") or {}
+        return cls(cfg.get("columns") or list(expected.columns), cfg.get("key") or (),
+                   cfg.get("tolerance", DEFAULT_TOLERANCE), cfg.get("max_mismatches", DEFAULT_MAX_MISMATCHES))
+
+
+class Mismatch:
+    __slots__ = ("row", "expected", "got")
+
+    def __init__(self, row: int, expected: Optional[Dict[str, Any]], got: Optional[Dict[str, Any]]):
+        self.row = row            # 1-based: candidate row (keyed) or sorted position (unkeyed)
+        self.expected = expected  # None when the candidate row has no expected counterpart
+        self.got = got
+
+
+class DiffResult:
+    __slots__ = ("missing_columns", "expected_rows", "got_rows", "mismatches", "truncated")
+
+    def __init__(self, missing_columns=(), expected_rows=0, got_rows=0, mismatches=(), truncated=False):
+        self.missing_columns = list(missing_columns)
+        self.expected_rows = expected_rows
+        self.got_rows = got_rows
+        self.mismatches: List[Mismatch] = list(mismatches)
+        self.truncated = truncated  # more mismatches exist than were reported
+
+    @property
+    def equal(self) -> bool:
+        return not self.missing_columns and self.expected_rows == self.got_rows and not self.mismatches
+
+
+# ---------- Expected side (prepared once per answer-key value) ----------
+class _Expected:
+    __slots__ = ("columns", "numeric", "arrays", "rows", "order", "key_index")
+
+    def __init__(self, df: pd.DataFrame, columns: Tuple[str, ...]):
+        self.columns = columns
+        self.numeric = tuple(c in df.columns and pd.api.types.is_numeric_dtype(df[c]) for c in columns)
+        self.arrays = []
+        for c, num in zip(columns, self.numeric):
+            col = df[c] if c in df.columns else pd.Series([None] * len(df))
+            self.arrays.append(col.to_numpy(dtype=np.float64) if num else col.astype(str).to_numpy(dtype=object))
+        self.rows = [tuple(map(_canon, r)) for r in zip(*(a.tolist() for a in self.arrays))] if len(df) else []
+        self.order: Optional[np.ndarray] = None  # row order for the unkeyed large-table compare
+        self.key_index: Dict[Tuple[int, ...], tuple] = {}  # key columns -> (hashes, argsort of hashes)
+
+
+_PREPARED: Dict[Tuple[str, Tuple[str, ...]], tuple] = {}  # (eval_key, columns) -> (frame, _Expected)
+_LOCK = threading.Lock()
+
+
+def _prepared(eval_key: str, df: pd.DataFrame, columns: Tuple[str, ...]) -> _Expected:
+    # answer_keys hands out a new frame whenever the key is recomputed, so identity is the version
+    with _LOCK:
+        hit = _PREPARED.get((eval_key, columns))
+        if hit is not None and hit[0] is df:
+            return hit[1]
+    exp = _Expected(df, columns)
+    with _LOCK:
+        _PREPARED[(eval_key, columns)] = (df, exp)
+    return exp
+
+
+# ---------- Candidate side ----------
+def _canon(v):
+    # one NaN object, so rows with empty numeric cells compare and hash equal as dict keys
+    return math.nan if v != v else v
+
+
+def _to_float(v) -> float:
+    try:
+        return _canon(float(v))
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _py_rows(rows: List[Dict[str, Any]], exp: _Expected) -> List[tuple]:
+    return [tuple(_to_float(r.get(c)) if num else str(r.get(c)) for c, num in zip(exp.columns, exp.numeric))
+            for r in rows]
+
+
+def _np_columns(rows: List[Dict[str, Any]], exp: _Expected) -> List[np.ndarray]:
+    out = []
+    for c, num in zip(exp.columns, exp.numeric):
+        vals = [r.get(c) for r in rows]
+        if num:
+            try:
+                out.append(np.array(vals, dtype=np.float64))
+            except (TypeError, ValueError):
+                out.append(np.fromiter((_to_float(v) for v in vals), dtype=np.float64, count=len(vals)))
+        else:
+            out.append(np.array([str(v) for v in vals], dtype=object))
+    return out
+
+
+def _row_dict(columns, values) -> Dict[str, Any]:
+    return {c: (round(float(v), 2) if isinstance(v, float) else v) for c, v in zip(columns, values)}
+
+
+# ---------- Pure Python (small tables) ----------
+def _same(a: tuple, b: tuple, numeric, tol: float) -> bool:
+    for x, y, num in zip(a, b, numeric):
+        if num:
+            if not abs(x - y) <= tol and not (x != x and y != y):  # empty cells match each other
+                return False
+        elif x != y:
+            return False
+    return True
+
+
+def _sort_key(numeric):
+    # text columns first so near-equal numbers do not reorder otherwise identical rows
+    text = [i for i, n in enumerate(numeric) if not n]
+    nums = [i for i, n in enumerate(numeric) if n]
+    return lambda r: (tuple(r[i] for i in text), tuple(-math.inf if r[i] != r[i] else r[i] for i in nums))
+
+
+def _diff_small(exp: _Expected, got: List[tuple], spec: TableSpec) -> Tuple[List[Mismatch], bool]:
+    cols, numeric, tol, limit = exp.columns, exp.numeric, spec.tolerance, spec.max_mismatches
+    out: List[Mismatch] = []
+    if spec.key:
+        kidx = [cols.index(k) for k in spec.key]
+        index = {tuple(r[i] for i in kidx): r for r in exp.rows}
+        seen = set()
+        for n, r in enumerate(got, 1):
+            k = tuple(r[i] for i in kidx)
+            e = index.get(k) if k not in seen else None
+            seen.add(k)
+            if e is None or not _same(e, r, numeric, tol):
+                if len(out) == limit:
+                    return out, True
+                out.append(Mismatch(n, _row_dict(cols, e) if e else None, _row_dict(cols, r)))
+        return out, False
+    key = _sort_key(numeric)
+    for n, (e, r) in enumerate(zip(sorted(exp.rows, key=key), sorted(got, key=key)), 1):
+        if not _same(e, r, numeric, tol):
+            if len(out) == limit:
+                return out, True
+            out.append(Mismatch(n, _row_dict(cols, e), _row_dict(cols, r)))
+    return out, False
+
+
+# ---------- numpy (large tables) ----------
+def _hash_columns(arrays: List[np.ndarray]) -> np.ndarray:
+    h = np.zeros(len(arrays[0]), dtype=np.uint64)
+    for a in arrays:
+        h = h * np.uint64(1000003) ^ pd.util.hash_array(a, categorize=False)
+    return h
+
+
+def _eq(e: np.ndarray, g: np.ndarray, num: bool, tol: float = 0.0) -> np.ndarray:
+    if not num:
+        return e == g
+    return (np.abs(e - g) <= tol) | (np.isnan(e) & np.isnan(g))
+
+
+def _row_ok(exp_arrays, got_arrays, numeric, tol: float) -> np.ndarray:
+    ok = np.ones(len(got_arrays[0]), dtype=bool)
+    for e, g, num in zip(exp_arrays, got_arrays, numeric):
+        ok &= _eq(e, g, num, tol)
+    return ok
+
+
+def _diff_large(exp: _Expected, got: List[np.ndarray], spec: TableSpec) -> Tuple[List[Mismatch], bool]:
+    cols, numeric, limit = exp.columns, exp.numeric, spec.max_mismatches
+    if spec.key:
+        kidx = [cols.index(k) for k in spec.key]
+        if tuple(kidx) not in exp.key_index:
+            h = _hash_columns([exp.arrays[i] for i in kidx])
+            exp.key_index[tuple(kidx)] = (h, np.argsort(h, kind="stable"))
+        eh, order = exp.key_index[tuple(kidx)]
+        gh = _hash_columns([got[i] for i in kidx])
+        pos = np.minimum(np.searchsorted(eh[order], gh), len(eh) - 1)
+        match = order[pos]
+        found = eh[match] == gh
+        for i in kidx:  # rule out hash collisions
+            found &= _eq(exp.arrays[i][match], got[i], numeric[i])
+        # a repeated key only matches once
+        first = np.zeros(len(gh), dtype=bool)
+        first[np.unique(np.where(found, match, -1 - np.arange(len(gh))), return_index=True)[1]] = True
+        found &= first
+        ok = found & _row_ok([a[match] for a in exp.arrays], got, numeric, spec.tolerance)
+        bad = np.flatnonzero(~ok)
+        out = [Mismatch(int(n) + 1,
+                        _row_dict(cols, [a[match[n]] for a in exp.arrays]) if found[n] else None,
+                        _row_dict(cols, [a[n] for a in got]))
+               for n in bad[:limit]]
+        return out, len(bad) > limit
+
+    def lexorder(arrays):
+        # primary key: one hash over the text columns (arbitrary but identical order on both
+        # sides, and far cheaper than sorting strings); then the numbers
+        text = [a for a, n in zip(arrays, numeric) if not n]
+        keys = [a for a, n in zip(arrays, numeric) if n][::-1] + ([_hash_columns(text)] if text else [])
+        return np.lexsort(keys)
+
+    if exp.order is None:
+        exp.order = lexorder(exp.arrays)
+    eo, go = exp.order, lexorder(got)
+    es, gs = [a[eo] for a in exp.arrays], [a[go] for a in got]
+    bad = np.flatnonzero(~_row_ok(es, gs, numeric, spec.tolerance))
+    out = [Mismatch(int(n) + 1, _row_dict(cols, [a[n] for a in es]), _row_dict(cols, [a[n] for a in gs]))
+           for n in bad[:limit]]
+    return out, len(bad) > limit
+
+
+# ---------- Entry point ----------
+def compare(eval_key: str, expected: pd.DataFrame, rows: List[Dict[str, Any]], spec: TableSpec) -> DiffResult:
+    """Diff candidate `rows` against the expected answer-key frame."""
+    missing = [c for c in spec.columns if not any(c in r for r in rows)]
+    if missing:
+        return DiffResult(missing, len(expected), len(rows))
+    if len(rows) != len(expected):
+        return DiffResult((), len(expected), len(rows))
+    exp = _prepared(eval_key, expected, spec.columns)
+    if not rows:
+        return DiffResult((), 0, 0)
+    if len(rows) <= SMALL_ROWS:
+        mismatches, more = _diff_small(exp, _py_rows(rows, exp), spec)
+    else:
+        mismatches, more = _diff_large(exp, _np_columns(rows, exp), spec)
+    return DiffResult((), len(expected), len(rows), mismatches, more)
@@ -1,24 +1,22 @@
 # ---------- Load .env early ----------
+import time
+_IMPORT_T0 = time.perf_counter()  # for the /admin/startup report
 from dotenv import load_dotenv
 from pathlib import Path
 load_dotenv(dotenv_path=Path(__file__).resolve().parents[1] / ".env")
 
 # ---------- Imports ----------
-import os
-from fastapi import FastAPI, HTTPException
+import os, sys, hmac, json, asyncio
+from fastapi import Depends, FastAPI, Header, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
-from sqlalchemy import func
-from sqlalchemy.orm import Session
 
-from app.services import state, report, llm
-from app.grading import pandas_eval, formula_rules
+from app.services import state, report, grading_queue, persist, irt, timings, concurrency, metrics as agg
+from app.grading import registry, grade_cache  # graders (pandas, openai) are imported lazily per kind
 from app.questions.bank import get_question_by_id
-from app.db import init_db, SessionLocal, Answer
-
-# Optional sanity print (remove if you prefer quiet logs)
-print("LLM active?", bool(os.getenv("OPENAI_API_KEY")))
+from app.db import init_db
 
 # ---------- App init ----------
 app = FastAPI(title="Excel Mock Interviewer Advanced PoC", version="0.2.0")
@@ -30,9 +28,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+_STARTUP = {"app_import_ms": round((time.perf_counter() - _IMPORT_T0) * 1000.0, 2)}
+
 @app.on_event("startup")
 def _startup():
+    t0 = time.perf_counter()
     init_db()
+    agg.backfill()      # seed /admin/metrics aggregates from historic answers
+    if state.SELECTION_MODE == "irt":
+        irt.seed(agg.question_counts())  # item difficulties from historic pass rates
+    registry.start_warmup()  # import graders + load answer keys (background by default)
+    _STARTUP["startup_ms"] = round((time.perf_counter() - t0) * 1000.0, 2)
+
+@app.on_event("shutdown")
+def _shutdown():
+    concurrency.shutdown()    # finish in-flight request work
+    grading_queue.shutdown()  # drain deferred text grades before exit
+    persist.shutdown()        # then flush buffered rows
+    if "app.services.llm" in sys.modules:  # only if a text answer was ever graded
+        sys.modules["app.services.llm"].close()
+
+# ---------- Timings (see /admin/timings) ----------
+_STAGE_HELP = "Wall time of each /answer stage"
+_T_LOOKUP = timings.histogram("answer_stage_seconds", _STAGE_HELP, stage="lookup")
+_T_GRADE = timings.histogram("answer_stage_seconds", _STAGE_HELP, stage="grade")
+_T_RECORD = timings.histogram("answer_stage_seconds", _STAGE_HELP, stage="record_answer")
+_T_NEXT = timings.histogram("answer_stage_seconds", _STAGE_HELP, stage="next_question")
+_T_REPORT = timings.histogram("answer_stage_seconds", _STAGE_HELP, stage="generate_report")
+_T_TOTAL = timings.histogram("answer_seconds", "Wall time of /answer handlers (grading requests only)")
+_C_HINTS = timings.counter("hints_total", "Hint requests")
+_C_GRADER_ERRORS = timings.counter("grader_errors_total", "Grader calls that raised")
 
 # ---------- Models ----------
 class StartRequest(BaseModel):
@@ -52,10 +77,11 @@ def health():
 
 # ---------- Start interview ----------
 @app.post("/start")
-def start(req: StartRequest):
-    itv = state.create_interview(req.candidate_email)
-    q = state.next_question(itv["id"])
-    return {"interview_id": itv["id"], "question": q}
+async def start(req: StartRequest):
+    itv = await concurrency.run("state", state.create_interview, req.candidate_email)
+    async with concurrency.interview_lock(itv.id):
+        q = await concurrency.run("state", state.next_question, itv.id)
+    return {"interview_id": itv.id, "question": q}
 
 # ---------- Helpers ----------
 def detect_kind(ans_text: Optional[str], ans_table: Optional[List[Dict[str, Any]]]) -> str:
@@ -77,26 +103,41 @@ def detect_kind(ans_text: Optional[str], ans_table: Optional[List[Dict[str, Any]
     except Exception:
         return "text"
 
+def _lookup(req: AnswerRequest):
+    itv = state.get_interview(req.interview_id)
+    return itv, (get_question_by_id(req.question_id) if itv else None)
+
 # ---------- Answer endpoint (with type-guard + hints) ----------
 @app.post("/answer")
-def answer(req: AnswerRequest):
-    itv = state.get_interview(req.interview_id)
+async def answer(req: AnswerRequest):
+    # One request per interview at a time: a double-submit waits here, then sees the first answer
+    async with concurrency.interview_lock(req.interview_id):
+        return await _answer_locked(req)
+
+
+async def _answer_locked(req: AnswerRequest, emit=None):
+    with _T_LOOKUP.time():
+        itv, q = await concurrency.run("state", _lookup, req)
     if not itv:
         raise HTTPException(404, "Interview not found")
-
-    q = get_question_by_id(req.question_id)
     if not q:
         raise HTTPException(404, "Question not found")
 
     # Hints do not advance the interview
     if req.want_hint:
-        state.record_hint(req.interview_id, q["id"])
+        _C_HINTS.inc()
+        await concurrency.run("state", state.record_hint, req.interview_id, q["id"])
         return {"hint": q.get("hint", "Try breaking the task into smaller parts.")}
 
+    if state.answered(itv, q["id"]):
+        raise HTTPException(409, "An answer for this question was already recorded")
+
     # Type guard: if user submits the wrong type, re-ask same question without advancing
     expected = q.get("kind", "formula")
     detected = detect_kind(req.answer_text, req.answer_table)
     if detected != expected:
+        timings.counter("type_guard_rejections_total", "Answers rejected for the wrong answer type",
+                        expected=expected, detected=detected).inc()
         return {
             "score": 0,
             "feedback": f"This question expects **{expected}**, but you entered **{detected}**. Please answer in the expected format.",
@@ -112,33 +153,69 @@ def answer(req: AnswerRequest):
             },
         }
 
-    # Evaluate according to kind
-    try:
-        if expected == "formula":
-            score, fb, ok = formula_rules.evaluate_formula(q, (req.answer_text or ""))
-        elif expected in ("value", "table"):
-            score, fb, ok = pandas_eval.evaluate(q, req.answer_text, req.answer_table)
-        elif expected == "text":
-            score, fb, ok = llm.evaluate_text_with_rubric(q, (req.answer_text or ""))
-        else:
-            score, fb, ok = 0.0, "Unknown question kind.", False
-    except Exception as e:
-        score, fb, ok = 0.0, f"Evaluation error: {e}", False
+    with _T_TOTAL.time():
+        try:
+            return await _grade_and_advance(req, q, expected, emit)
+        except state.DuplicateAnswer:  # answered through another worker meanwhile
+            raise HTTPException(409, "An answer for this question was already recorded")
+
+
+def _final_report(iid: str):
+    return report.generate_report(state.get_interview(iid))
+
+
+async def _grade_and_advance(req: AnswerRequest, q: dict, expected: str, emit=None):
+    """Grade, record and advance; the caller holds the interview lock. `emit` streams feedback."""
+    # Deferred mode: record text answers as pending and grade them in the background
+    # (a streamed answer is graded inline: the client is waiting for the feedback)
+    if expected == "text" and grading_queue.deferred() and emit is None:
+        with _T_RECORD.time():
+            idx = await concurrency.run("state", state.record_answer, req.interview_id, q["id"],
+                                        req.answer_text, req.answer_table, None, "Grading in progress.")
+        grading_queue.submit(req.interview_id, idx, registry.grade, q, req.answer_text, req.answer_table)
+        with _T_NEXT.time():
+            nx = await concurrency.run("state", state.next_question, req.interview_id)
+        done = nx is None
+        with _T_REPORT.time():
+            summary = await concurrency.run("state", _final_report, req.interview_id) if done else None
+        return {
+            "score": None,
+            "feedback": "Answer received; grading in progress.",
+            "correct": None,
+            "pending": True,
+            "done": done,
+            "next_question": nx,
+            "summary": summary,
+        }
+
+    # Evaluate with the grader registered for this kind (text waits on the LLM: own pool)
+    with _T_GRADE.time():
+        try:
+            score, fb, ok = await concurrency.run("llm" if expected == "text" else "grading",
+                                                  registry.grade, q, req.answer_text, req.answer_table, emit)
+        except Exception as e:
+            _C_GRADER_ERRORS.inc()
+            score, fb, ok = 0.0, f"Evaluation error: {e}", False
 
     # Record this answer (for report/metrics)
-    state.record_answer(
-        req.interview_id,
-        q["id"],
-        req.answer_text,
-        req.answer_table,
-        score,
-        fb,
-    )
+    with _T_RECORD.time():
+        await concurrency.run(
+            "state",
+            state.record_answer,
+            req.interview_id,
+            q["id"],
+            req.answer_text,
+            req.answer_table,
+            score,
+            fb,
+        )
 
     # Advance to next question
-    nx = state.next_question(req.interview_id)
+    with _T_NEXT.time():
+        nx = await concurrency.run("state", state.next_question, req.interview_id)
     done = nx is None
-    summary = report.generate_report(itv) if done else None
+    with _T_REPORT.time():
+        summary = await concurrency.run("state", _final_report, req.interview_id) if done else None
     return {
         "score": score,
         "feedback": fb,
@@ -148,30 +225,141 @@ def answer(req: AnswerRequest):
         "summary": summary,
     }
 
+# ---------- Streamed answer (Server-Sent Events) ----------
+_STREAM_TASKS = set()  # answers still being graded after their client went away
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/answer/stream")
+async def answer_stream(req: AnswerRequest):
+    """
+    /answer as text/event-stream: "received" at once, "feedback" {delta} pieces while a text
+    answer is graded ("fallback" {reason} if the LLM fails and the rule-based score is used),
+    then "result" with the /answer body, or "error" {status, detail}.
+    """
+    # Unknown ids and repeats are refused with a real status before the stream starts;
+    # the checks are repeated under the interview lock (a race then ends in an "error" event)
+    itv, q = await concurrency.run("state", _lookup, req)
+    if not itv:
+        raise HTTPException(404, "Interview not found")
+    if not q:
+        raise HTTPException(404, "Question not found")
+    if not req.want_hint and state.answered(itv, q["id"]):
+        raise HTTPException(409, "An answer for this question was already recorded")
+
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+
+    def emit(event: str, data: dict):  # called from grading threads
+        loop.call_soon_threadsafe(events.put_nowait, (event, data))
+
+    async def work():
+        try:
+            async with concurrency.interview_lock(req.interview_id):
+                events.put_nowait(("result", await _answer_locked(req, emit)))
+        except HTTPException as e:
+            events.put_nowait(("error", {"status": e.status_code, "detail": e.detail}))
+        except Exception as e:
+            events.put_nowait(("error", {"status": 500, "detail": f"{type(e).__name__}: {e}"}))
+
+    async def stream():
+        # the answer is recorded even if the client disconnects mid-stream
+        task = asyncio.create_task(work())
+        _STREAM_TASKS.add(task)
+        task.add_done_callback(_STREAM_TASKS.discard)
+        yield _sse("received", {"interview_id": req.interview_id, "question_id": req.question_id})
+        while True:
+            event, data = await events.get()
+            yield _sse(event, data)
+            if event in ("result", "error"):
+                return
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# ---------- Poll a (possibly deferred) score ----------
+@app.get("/score/{iid}/{qid}")
+def score_api(iid: str, qid: str):
+    if not state.get_interview(iid):
+        raise HTTPException(404, "Interview not found")
+    s = state.get_score(iid, qid)
+    if not s:
+        raise HTTPException(404, "No answer recorded for this question")
+    return {
+        "interview_id": iid,
+        "question_id": qid,
+        "status": s.status,
+        "score": s.final_score,
+        "feedback": s.feedback,
+    }
+
 # ---------- Report ----------
 @app.get("/report/{iid}")
-def report_api(iid: str):
+def report_api(iid: str, answers: str = "all", offset: int = 0, limit: Optional[int] = None):
+    """answers=all (default) | none; offset/limit page through the raw answers."""
+    if answers not in ("all", "none"):
+        raise HTTPException(400, "answers must be 'all' or 'none'")
     itv = state.get_interview(iid)
     if not itv:
         raise HTTPException(404, "Interview not found")
-    return report.generate_report(itv)
+    return report.generate_report(itv, answers, offset, limit)
 
 # ---------- Simple admin metrics ----------
 @app.get("/admin/metrics")
 def metrics():
-    db: Session = SessionLocal()
+    # Served from incrementally maintained aggregates (no table scan)
+    return {
+        **agg.snapshot(),
+        "answer_keys": sys.modules["app.grading.answer_keys"].stats() if "app.grading.answer_keys" in sys.modules else None,
+        "persistence": persist.stats(),
+        "reports": report.stats(),
+        "grade_cache": grade_cache.stats(),
+        "concurrency": concurrency.stats(),
+    }
+
+# ---------- Bulk export (streamed; see app/export.py) ----------
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+def require_admin(authorization: Optional[str] = Header(None)):
+    """`Authorization: Bearer <ADMIN_TOKEN>`; the guarded endpoints are off while ADMIN_TOKEN is unset."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(403, "disabled: set ADMIN_TOKEN on the server to enable")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(401, "admin token required", headers={"WWW-Authenticate": "Bearer"})
+
+@app.get("/admin/export/{table}", dependencies=[Depends(require_admin)])
+def export_api(table: str, format: str = "ndjson", since: Optional[str] = None, gzip: bool = False):
+    """interviews|answers as NDJSON or CSV with since <= created_at < X-Export-Until."""
+    from app import export
+    if table not in export.TABLES:
+        raise HTTPException(404, f"table must be one of {sorted(export.TABLES)}")
+    if format not in export.FORMATS:
+        raise HTTPException(400, f"format must be one of {list(export.FORMATS)}")
     try:
-        total = db.query(func.count(Answer.id)).scalar() or 0
-        avg = float(db.query(func.avg(Answer.score)).scalar() or 0.0)
-        from collections import defaultdict
-        per = defaultdict(list)
-
-        for a in db.query(Answer).all():
-            q = get_question_by_id(a.question_id)
-            if q:
-                per[q.get("skill", "general")].append(a.score)
-
-        per_avg = {k: round(sum(v) / len(v), 2) if v else 0.0 for k, v in per.items()}
-        return {"total_answers": total, "avg_score": round(avg, 2), "per_skill_avg": per_avg}
-    finally:
-        db.close()
+        start = export.parse_time(since)
+    except ValueError:
+        raise HTTPException(400, "since must be an ISO-8601 timestamp")
+    until = export.settled_until()
+    name = f"{table}-{until:%Y%m%dT%H%M%S}.{format}" + (".gz" if gzip else "")
+    media = "application/gzip" if gzip else ("application/x-ndjson" if format == "ndjson" else "text/csv")
+    # a sync generator: Starlette pulls it on a worker thread, so the event loop stays free
+    return StreamingResponse(export.stream(table, format, start, until, gzip), media_type=media, headers={
+        "X-Export-Until": export.format_time(until),
+        "Content-Disposition": f'attachment; filename="{name}"',
+    })
+
+# ---------- Cold-start report ----------
+@app.get("/admin/startup")
+def startup_report():
+    """App import + startup time, whether an LLM key is set, per-kind grader import / warm-up time, and bank rule errors."""
+    rules = sys.modules.get("app.grading.formula_rules")
+    return {**_STARTUP, "llm_active": bool(os.getenv("OPENAI_API_KEY")),
+            "grader_warm": registry.GRADER_WARM, "graders": registry.report(),
+            "formula_rule_errors": rules.rule_errors() if rules else None}
+
+# ---------- Hot-path timings (Prometheus text format) ----------
+@app.get("/admin/timings", response_class=PlainTextResponse)
+def timings_api():
+    return PlainTextResponse(timings.render(), media_type="text/plain; version=0.0.4")
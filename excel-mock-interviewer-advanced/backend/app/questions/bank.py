@@ -1,9 +1,173 @@
-import json, pathlib
-def _load():
-    here = pathlib.Path(__file__).parent
-    with open(here/'bank.json','r',encoding='utf-8') as f:
-        return json.load(f)
-_BANK=_load()
-_ID={q['id']:q for q in _BANK['questions']}
-def get_bank(): return _BANK
-def get_question_by_id(qid:str): return _ID.get(qid)
+import os, json, time, logging, pathlib, hashlib, sqlite3, tempfile, threading
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+
+# bank.json is compiled into an indexed SQLite store. Only ids + light metadata stay in
+# memory; prompts/hints/rubrics are read on demand. Editing bank.json hot-swaps the store.
+HERE = pathlib.Path(__file__).parent
+SOURCE = pathlib.Path(os.getenv("BANK_SOURCE", str(HERE / "bank.json")))
+_STORE_DIR = HERE if os.access(HERE, os.W_OK) else pathlib.Path(tempfile.gettempdir())  # read-only deploys
+STORE = pathlib.Path(os.getenv("BANK_STORE", str(_STORE_DIR / ".bank_store.sqlite")))
+CHECK_SECS = float(os.getenv("BANK_CHECK_SECS", "2"))
+CACHE_SIZE = int(os.getenv("BANK_CACHE_SIZE", "2048"))  # full questions kept in memory
+HEAVY = ("prompt", "hint", "rubric")  # loaded on demand
+
+
+class _Index:
+    """Immutable snapshot of the bank's in-memory index; swapped as a whole on reload."""
+    __slots__ = ("gen", "version", "sha", "order", "meta", "by_difficulty", "by_skill")
+
+    def __init__(self, gen: int, version: str, sha: str, rows):
+        self.gen, self.version, self.sha = gen, version, sha
+        self.order: List[str] = []
+        self.meta: Dict[str, Dict[str, Any]] = {}
+        self.by_difficulty: Dict[str, List[str]] = {}
+        self.by_skill: Dict[str, List[str]] = {}
+        for qid, meta in rows:
+            self.order.append(qid); self.meta[qid] = meta
+            self.by_difficulty.setdefault(meta.get("difficulty", "M"), []).append(qid)
+            self.by_skill.setdefault(meta.get("skill", "general"), []).append(qid)
+
+
+_LOCK = threading.Lock()
+_LOCAL = threading.local()
+_IDX: Optional[_Index] = None
+_CHECKED = 0.0
+_LISTENERS: List[Callable[[], None]] = []
+_FAILED_SIG: Optional[str] = None  # bank.json version that last failed to load (logged once)
+_LOG = logging.getLogger("app.bank")
+
+
+def _sha(path: pathlib.Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def _stat_sig(path: pathlib.Path) -> str:
+    st = path.stat()
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+def _compile(sha: str):
+    """Parse bank.json into a fresh store file and atomically move it into place."""
+    with open(SOURCE, "r", encoding="utf-8") as f:
+        bank = json.load(f)
+    tmp = STORE.with_name(f"{STORE.name}.{os.getpid()}.tmp")
+    if tmp.exists(): tmp.unlink()
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute("CREATE TABLE questions (pos INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, meta TEXT NOT NULL, body TEXT NOT NULL)")
+        conn.executemany("INSERT INTO questions VALUES (?, ?, ?, ?)", (
+            (i, q["id"], json.dumps({k: v for k, v in q.items() if k not in HEAVY}),
+             json.dumps({k: q[k] for k in HEAVY if k in q}))
+            for i, q in enumerate(bank["questions"])
+        ))
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("version", str(bank.get("version", ""))), ("source_sha", sha), ("source_sig", _stat_sig(SOURCE)),
+        ])
+        conn.commit()
+    except Exception:
+        conn.close(); tmp.unlink()
+        raise
+    conn.close()
+    os.replace(tmp, STORE)
+
+
+def _store_meta() -> Dict[str, str]:
+    if not STORE.exists():
+        return {}
+    try:
+        conn = sqlite3.connect(f"file:{STORE}?mode=ro", uri=True)
+        try: return dict(conn.execute("SELECT key, value FROM meta"))
+        finally: conn.close()
+    except sqlite3.Error:
+        return {}
+
+
+def _load_index(gen: int) -> _Index:
+    conn = sqlite3.connect(f"file:{STORE}?mode=ro", uri=True)
+    try:
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        rows = ((qid, json.loads(m)) for qid, m in conn.execute("SELECT id, meta FROM questions ORDER BY pos"))
+        return _Index(gen, meta.get("version", ""), meta.get("source_sha", ""), rows)
+    finally:
+        conn.close()
+
+
+def _refresh(force: bool = False) -> _Index:
+    """(Re)build the index if bank.json changed; cheap stat check at most every CHECK_SECS."""
+    global _IDX, _CHECKED, _FAILED_SIG
+    now = time.monotonic()
+    if _IDX is not None and not force and now - _CHECKED < CHECK_SECS:
+        return _IDX
+    with _LOCK:
+        if _IDX is not None and not force and now - _CHECKED < CHECK_SECS:
+            return _IDX
+        _CHECKED = now
+        sig = None
+        try:
+            sig = _stat_sig(SOURCE)
+            stored = _store_meta()
+            if _IDX is not None and stored.get("source_sig") == sig and _IDX.sha == stored.get("source_sha"):
+                return _IDX
+            if stored.get("source_sig") != sig:
+                sha = _sha(SOURCE)
+                if stored.get("source_sha") != sha:
+                    _compile(sha)  # another worker may already have compiled it: then sig matches above
+                elif _IDX is not None and _IDX.sha == sha:
+                    return _IDX  # touched, not changed
+            old = _IDX
+            _IDX = _load_index(old.gen + 1 if old else 1)
+            _FAILED_SIG = None
+        except Exception as e:
+            # a half-saved or invalid bank.json: keep serving the last good index, retry next check
+            if _IDX is None:
+                raise
+            if sig is None or sig != _FAILED_SIG:
+                _FAILED_SIG = sig
+                _LOG.error("bank: cannot load %s, keeping version %s: %s", SOURCE, _IDX.version or _IDX.sha[:12], e)
+            return _IDX
+    if old is not None:
+        for fn in list(_LISTENERS):
+            fn()
+    return _IDX
+
+
+def _conn() -> sqlite3.Connection:
+    """Per-thread read connection, reopened after a reload replaced the store file."""
+    idx = _refresh()
+    conn = getattr(_LOCAL, "conn", None)
+    if conn is None or _LOCAL.gen != idx.gen:
+        if conn is not None: conn.close()
+        conn = _LOCAL.conn = sqlite3.connect(f"file:{STORE}?mode=ro", uri=True, check_same_thread=False)
+        _LOCAL.gen = idx.gen
+    return conn
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _question(gen: int, qid: str) -> Optional[Dict[str, Any]]:
+    meta = _IDX.meta.get(qid) if _IDX and _IDX.gen == gen else None
+    if meta is None:
+        return None
+    row = _conn().execute("SELECT body FROM questions WHERE id = ?", (qid,)).fetchone()
+    return {**meta, **json.loads(row[0])} if row else dict(meta)
+
+
+def on_reload(fn: Callable[[], None]):
+    """Call `fn()` after every hot reload of the bank."""
+    _LISTENERS.append(fn)
+    return fn
+
+
+def generation() -> int: return _refresh().gen
+def bank_version() -> str: idx = _refresh(); return f"{idx.version}:{idx.sha[:12]}"
+def get_question_by_id(qid: str): idx = _refresh(); return _question(idx.gen, qid) if qid in idx.meta else None
+def question_meta(qid: str): return _refresh().meta.get(qid)  # no prompt/hint/rubric
+def all_meta(): idx = _refresh(); return [idx.meta[q] for q in idx.order]
+def get_bank():
+    # Materializes every question: prefer the index helpers on hot paths.
+    idx = _refresh(); return {"version": idx.version, "questions": [_question(idx.gen, q) for q in idx.order]}
+def question_ids(): return _refresh().order
+def ids_by_difficulty(d: str): return _refresh().by_difficulty.get(d, [])
+def ids_by_skill(skill: str): return _refresh().by_skill.get(skill, [])
+def reload(): return _refresh(force=True)
@@ -0,0 +1,213 @@
+"""
+Re-score historic answers after a grader fix.
+
+    python -m app.regrade [--workers N] [--chunk 500] [--batch 2000] [--question QID ...]
+                          [--include-text] [--dry-run] [--checkpoint FILE] [--restart]
+
+Rows are streamed from `answers` ordered by (question_id, id) with a server-side cursor,
+cut into per-question chunks and graded in a process pool (each worker keeps its
+answer keys cached, and a chunk only ever needs one). Results are consumed in
+submission order, changed rows are written back in batched UPDATEs, and the last
+committed (question_id, id) is saved to a checkpoint file so an interrupted run resumes
+where it stopped. Hint penalties are re-applied from the stored feedback suffix.
+The /admin/metrics aggregates are adjusted in the same transaction as each UPDATE batch.
+"""
+import os, re, sys, json, time, signal, argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, or_, select, update
+
+from app.db import engine, Answer
+from app.services import metrics
+
+DEFAULT_CHECKPOINT = "./regrade.checkpoint.json"
+TEXT_KINDS = ("text",)
+
+# "(−0.5 for 1 hint)" as appended by state._finalize
+_HINT_SUFFIX = re.compile(r" \(−(\d+(?:\.\d+)?) for (\d+) hints?\)$")
+
+Row = Tuple[int, Optional[str], Optional[str], Optional[float], Optional[str]]  # id, text, table json, score, feedback
+Seen = Dict[int, Tuple[Optional[float], Any]]  # id -> (old score, created_at), for the metrics adjustment
+
+
+# ---------- Worker side ----------
+def _init_worker():
+    from app.grading import registry
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C is handled by the driver
+    registry.warm_all()
+
+
+def _grade(q: dict, text: Optional[str], table) -> Tuple[float, str]:
+    from app.grading import registry
+    try:
+        score, fb, _ = registry.grade(q, text, table)
+    except Exception as e:
+        score, fb = 0.0, f"Evaluation error: {e}"
+    return float(score), fb
+
+
+def _with_hint_penalty(score: float, fb: str, old_fb: Optional[str]) -> Tuple[float, str]:
+    m = _HINT_SUFFIX.search(old_fb or "")
+    if not m:
+        return score, fb
+    return max(0.0, score - float(m.group(1))), f"{fb}{m.group(0)}"
+
+
+def grade_chunk(qid: str, rows: List[Row]) -> Tuple[List[Dict[str, Any]], int]:
+    """Re-grade rows of one question. Returns (changed rows as update params, rows skipped)."""
+    from app.questions.bank import get_question_by_id
+    q = get_question_by_id(qid)
+    if not q:
+        return [], len(rows)
+    changed = []
+    for rid, text, table_json, old_score, old_fb in rows:
+        table = json.loads(table_json) if table_json else None
+        score, fb = _with_hint_penalty(*_grade(q, text, table), old_fb)
+        if old_score is None or abs(score - old_score) > 1e-9 or fb != (old_fb or ""):
+            changed.append({"_id": rid, "score": score, "feedback": fb})
+    return changed, 0
+
+
+# ---------- Checkpoint ----------
+def _load_checkpoint(path: str) -> Optional[Tuple[str, int]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cp = json.load(f)
+        return cp["question_id"], int(cp["id"])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _save_checkpoint(path: str, qid: str, rid: int, totals: Dict[str, int]):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"question_id": qid, "id": rid, **totals}, f)
+    os.replace(tmp, path)
+
+
+# ---------- Driver ----------
+def _chunks(conn, after: Optional[Tuple[str, int]], questions, kinds_skip, chunk: int):
+    """Yield (qid, rows, seen, skipped) chunks of at most `chunk` rows, never mixing questions;
+    `skipped` counts rows of kinds_skip passed over since the previous chunk (a last chunk may be empty)."""
+    from app.questions.bank import question_meta
+    stmt = select(Answer.id, Answer.question_id, Answer.answer_text, Answer.answer_table_json,
+                  Answer.score, Answer.feedback, Answer.created_at).order_by(Answer.question_id, Answer.id)
+    if after:
+        stmt = stmt.where(or_(Answer.question_id > after[0], and_(Answer.question_id == after[0], Answer.id > after[1])))
+    if questions:
+        stmt = stmt.where(Answer.question_id.in_(questions))
+    result = conn.execution_options(stream_results=True, yield_per=chunk).execute(stmt)
+    qid, rows, seen, skip, skipped = None, [], {}, False, 0
+    for rid, row_qid, text, table_json, score, fb, created in result:
+        if row_qid != qid:
+            if rows:
+                yield qid, rows, seen, skipped
+                skipped = 0
+            qid, rows, seen = row_qid, [], {}
+            meta = question_meta(qid)
+            skip = bool(meta) and meta.get("kind") in kinds_skip
+        if skip:
+            skipped += 1
+            continue
+        rows.append((rid, text, table_json, score, fb))
+        seen[rid] = (score, created)
+        if len(rows) >= chunk:
+            yield qid, rows, seen, skipped
+            rows, seen, skipped = [], {}, 0
+    if rows or skipped:
+        yield qid, rows, seen, skipped
+
+
+def run(workers: int = os.cpu_count() or 2, chunk: int = 500, batch: int = 2000, questions=None,
+        include_text: bool = False, dry_run: bool = False, checkpoint: str = DEFAULT_CHECKPOINT,
+        restart: bool = False, log=sys.stderr) -> Dict[str, Any]:
+    after = None if restart else _load_checkpoint(checkpoint)
+    totals = {"rows": 0, "changed": 0, "skipped": 0}
+    pending_updates: List[Dict[str, Any]] = []
+    pending_folds: List[Tuple[str, Optional[float], Any, int]] = []
+    last: Optional[Tuple[str, int]] = None
+    stmt = update(Answer).where(Answer.id == bindparam("_id")).values(score=bindparam("score"), feedback=bindparam("feedback"))
+    t0 = t_log = time.monotonic()
+
+    def commit():
+        nonlocal pending_updates, pending_folds
+        if pending_updates and not dry_run:
+            with engine.begin() as wconn:
+                wconn.execute(stmt, pending_updates)
+                metrics.fold(wconn, pending_folds)
+        pending_updates, pending_folds = [], []
+        if last and not dry_run:
+            _save_checkpoint(checkpoint, last[0], last[1], totals)
+
+    if after:
+        print(f"resuming after {after[0]} #{after[1]}", file=log)
+    # reads and writes use separate connections; SQLite WAL lets the cursor keep streaming
+    with engine.connect() as rconn, ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        inflight: deque = deque()
+        chunks = _chunks(rconn, after, questions, () if include_text else TEXT_KINDS, chunk)
+
+        def drain_one():
+            nonlocal last, t_log
+            qid, last_id, n, passed, seen, fut = inflight.popleft()
+            changed, skipped = fut.result()
+            n, skipped = n + passed, skipped + passed  # rows of skipped kinds just before this chunk
+            pending_updates.extend(changed)
+            for row in changed:
+                old, created = seen[row["_id"]]
+                pending_folds.extend([(qid, old, created, -1), (qid, row["score"], created, 1)])
+            totals["rows"] += n
+            totals["changed"] += len(changed)
+            totals["skipped"] += skipped
+            last = (qid, last_id)
+            if len(pending_updates) >= batch:
+                commit()
+            now = time.monotonic()
+            if now - t_log >= 5:
+                t_log = now
+                print(f"{totals['rows']} rows ({totals['rows'] / (now - t0):.0f}/s), {totals['changed']} changed", file=log)
+
+        try:
+            for qid, rows, seen, skipped in chunks:
+                if not rows:  # only skipped rows left
+                    totals["rows"] += skipped
+                    totals["skipped"] += skipped
+                    continue
+                inflight.append((qid, rows[-1][0], len(rows), skipped, seen, pool.submit(grade_chunk, qid, rows)))
+                if len(inflight) >= workers * 2:  # bounded: memory stays flat however large the table
+                    drain_one()
+            while inflight:
+                drain_one()
+        except KeyboardInterrupt:
+            # keep what finished in order; the checkpoint makes the next run pick up from there
+            pool.shutdown(wait=False, cancel_futures=True)
+            commit()
+            print(f"interrupted after {totals['rows']} rows; rerun to resume", file=log)
+            raise SystemExit(130)
+        commit()
+
+    secs = time.monotonic() - t0
+    out = {**totals, "seconds": round(secs, 2), "rows_per_sec": round(totals["rows"] / secs, 1) if secs else 0.0,
+           "dry_run": dry_run}
+    if not dry_run and os.path.exists(checkpoint):
+        os.remove(checkpoint)  # finished: the next run starts from the top
+    return out
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m app.regrade", description="Re-score stored answers with the current graders.")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    p.add_argument("--chunk", type=int, default=500, help="rows per grading task")
+    p.add_argument("--batch", type=int, default=2000, help="changed rows per UPDATE transaction")
+    p.add_argument("--question", action="append", dest="questions", help="only this question id (repeatable)")
+    p.add_argument("--include-text", action="store_true", help="also re-grade text answers (calls the LLM)")
+    p.add_argument("--dry-run", action="store_true", help="grade and count, write nothing")
+    p.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    p.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    a = p.parse_args(argv)
+    print(json.dumps(run(a.workers, a.chunk, a.batch, a.questions, a.include_text, a.dry_run, a.checkpoint, a.restart)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import os, time, asyncio, functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List
+
+from app.services import timings
+
+# Async handlers hand blocking work to dedicated pools instead of Starlette's shared one:
+#   state   - session store, DB and report work (short; SQLite store does file I/O)
+#   grading - in-process graders (formula/pandas; CPU bound)
+#   llm     - text grading (waits on the network; LLM_MAX_CONCURRENCY still caps calls)
+# Mutations to one interview are serialized by a per-interview asyncio lock, so different
+# interviews proceed in parallel while double-submits for the same one queue up.
+STATE_THREADS = int(os.getenv("STATE_THREADS", "8"))
+GRADING_THREADS = int(os.getenv("GRADING_THREADS", str(min(8, (os.cpu_count() or 1) + 1))))
+LLM_THREADS = int(os.getenv("LLM_THREADS", "16"))
+
+_POOLS: Dict[str, ThreadPoolExecutor] = {}
+_LOCKS: Dict[str, asyncio.Lock] = {}
+_HOLDERS: Dict[str, int] = {}  # iid -> tasks holding or waiting for its lock
+_T_LOCK_WAIT = timings.histogram("interview_lock_wait_seconds", "Time spent waiting for a busy interview lock")
+_C_CONTENDED = timings.counter("interview_lock_contended_total", "Interview lock acquisitions that had to wait")
+
+
+def _pool(name: str) -> ThreadPoolExecutor:
+    pool = _POOLS.get(name)
+    if pool is None:  # only ever called on the event loop thread
+        size = {"state": STATE_THREADS, "grading": GRADING_THREADS, "llm": LLM_THREADS}[name]
+        pool = _POOLS[name] = ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"{name}-")
+    return pool
+
+
+async def run(pool: str, fn: Callable, *args, **kwargs) -> Any:
+    """Run blocking `fn` on the named pool ("state" | "grading" | "llm") and await its result."""
+    return await asyncio.get_running_loop().run_in_executor(_pool(pool), functools.partial(fn, *args, **kwargs))
+
+
+@asynccontextmanager
+async def interview_lock(iid: str):
+    """Serialize request handling for one interview; the lock is dropped once nobody holds it."""
+    lock = _LOCKS.get(iid)
+    if lock is None:
+        lock = _LOCKS[iid] = asyncio.Lock()
+    _HOLDERS[iid] = _HOLDERS.get(iid, 0) + 1
+    try:
+        if lock.locked():
+            _C_CONTENDED.inc()
+            t0 = time.perf_counter()
+            await lock.acquire()
+            _T_LOCK_WAIT.observe(time.perf_counter() - t0)
+        else:
+            await lock.acquire()
+        try:
+            yield
+        finally:
+            lock.release()
+    finally:
+        _HOLDERS[iid] -= 1
+        if not _HOLDERS[iid]:
+            del _HOLDERS[iid], _LOCKS[iid]
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        "interview_locks": len(_LOCKS),
+        "pools": {n: {"threads": len(p._threads), "max": p._max_workers, "queued": p._work_queue.qsize()}
+                  for n, p in _POOLS.items()},
+    }
+
+
+def shutdown():
+    """Wait for in-flight blocking work, then stop the pools."""
+    pools: List[ThreadPoolExecutor] = list(_POOLS.values())
+    _POOLS.clear()
+    for p in pools:
+        p.shutdown(wait=True)
@@ -0,0 +1,64 @@
+import os, time, queue, threading
+from typing import Callable, List
+
+from app.services import state, timings
+
+# "sync" grades text answers inline; "async" records them as pending and grades in the background.
+TEXT_GRADING_MODE = os.getenv("TEXT_GRADING_MODE", "sync").lower()
+GRADING_WORKERS = int(os.getenv("GRADING_WORKERS", "4"))
+
+_Q: "queue.Queue" = queue.Queue()
+_WORKERS: List[threading.Thread] = []
+_LOCK = threading.Lock()
+_T_WAIT = timings.histogram("grading_queue_wait_seconds", "Time deferred jobs spent queued")
+
+
+def deferred() -> bool:
+    return TEXT_GRADING_MODE == "async"
+
+
+def _worker():
+    while True:
+        job = _Q.get()
+        try:
+            if job is None:
+                return
+            iid, idx, fn, args, queued_at = job
+            _T_WAIT.observe(time.perf_counter() - queued_at)
+            try:
+                score, fb, _ok = fn(*args)
+            except Exception as e:
+                score, fb = 0.0, f"Evaluation error: {e}"
+            state.complete_answer(iid, idx, score, fb)
+        finally:
+            _Q.task_done()
+
+
+def _ensure_workers():
+    if _WORKERS:
+        return
+    with _LOCK:
+        while len(_WORKERS) < GRADING_WORKERS:
+            t = threading.Thread(target=_worker, name=f"grader-{len(_WORKERS)}", daemon=True)
+            t.start()
+            _WORKERS.append(t)
+
+
+def submit(iid: str, idx: int, fn: Callable, *args):
+    """Grade `fn(*args)` in the background and store the result on score entry `idx`."""
+    _ensure_workers()
+    _Q.put((iid, idx, fn, args, time.perf_counter()))
+
+
+def depth() -> int:
+    return _Q.qsize()
+
+
+def shutdown():
+    """Finish queued jobs, then stop the workers."""
+    with _LOCK:
+        for _ in _WORKERS:
+            _Q.put(None)
+        for t in _WORKERS:
+            t.join()
+        _WORKERS.clear()
@@ -0,0 +1,146 @@
+import bisect, math, threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.questions.bank import question_meta, question_ids, on_reload
+
+# Rasch (1PL) model: P(pass) = sigmoid(theta - b).
+# Item difficulty b is estimated from pass/fail counts, shrunk towards a prior taken
+# from the bank's E/M/H label; items are kept in difficulty bins so selection only
+# looks at the bins nearest the candidate's ability.
+PRIOR_B = {"E": -1.0, "M": 0.0, "H": 1.0}
+PRIOR_WEIGHT = 5.0       # pseudo-attempts behind the bank label
+BIN_WIDTH = 0.25         # logits per bin
+THETA_STEP = 0.8         # initial ability update step, decays with answers seen
+PASS_RATIO = 0.6
+
+
+def _sigmoid(x: float) -> float:
+    return 1.0 / (1.0 + math.exp(-x))
+
+
+class _Item:
+    __slots__ = ("passes", "attempts", "prior", "b", "bin")
+
+    def __init__(self, prior: float):
+        self.passes = 0
+        self.attempts = 0
+        self.prior = prior
+        self.b = prior
+        self.bin = None
+
+    def estimate(self) -> float:
+        pp = PRIOR_WEIGHT * _sigmoid(-self.prior)  # prior pseudo-passes
+        pf = PRIOR_WEIGHT - pp
+        fails = self.attempts - self.passes
+        return math.log((fails + pf) / (self.passes + pp))
+
+
+_LOCK = threading.RLock()  # re-entered when a bank reload fires _reindex mid-call
+_ITEMS: Dict[str, _Item] = {}
+_BINS: Dict[int, Dict[str, None]] = {}  # bin -> ordered set of qids
+_BIN_KEYS: List[int] = []               # sorted keys of _BINS
+
+
+def _place(qid: str, item: _Item):
+    new = round(item.b / BIN_WIDTH)
+    if new == item.bin:
+        return
+    if item.bin is not None:
+        members = _BINS[item.bin]
+        members.pop(qid, None)
+        if not members:
+            del _BINS[item.bin]
+            _BIN_KEYS.pop(bisect.bisect_left(_BIN_KEYS, item.bin))
+    if new not in _BINS:
+        _BINS[new] = {}
+        bisect.insort(_BIN_KEYS, new)
+    _BINS[new][qid] = None
+    item.bin = new
+
+
+def _item(qid: str) -> Optional[_Item]:
+    item = _ITEMS.get(qid)
+    if item is None:
+        q = question_meta(qid)
+        if not q:
+            return None
+        if qid in _ITEMS:  # the lookup above may have triggered a reload + _reindex
+            return _ITEMS[qid]
+        item = _ITEMS[qid] = _Item(PRIOR_B.get(q.get("difficulty", "M"), 0.0))
+        _place(qid, item)
+    return item
+
+
+def _ensure_indexed():
+    if len(_ITEMS) < len(question_ids()):
+        for qid in question_ids():
+            _item(qid)
+
+
+@on_reload
+def _reindex():
+    """Drop questions removed from the bank and re-apply priors; keep counts of the rest."""
+    with _LOCK:
+        old = dict(_ITEMS)
+        _ITEMS.clear(); _BINS.clear(); _BIN_KEYS.clear()
+        for qid in question_ids():
+            item = _item(qid)
+            if qid in old:
+                item.passes, item.attempts = old[qid].passes, old[qid].attempts
+                item.b = item.estimate()
+                _place(qid, item)
+
+
+def observe(qid: str, passed: bool, n: int = 1, passes: Optional[int] = None):
+    """Record `n` attempts at `qid` (`passes` of them passed; defaults to all/none per `passed`)."""
+    with _LOCK:
+        item = _item(qid)
+        if item is None:
+            return
+        item.attempts += n
+        item.passes += (n if passed else 0) if passes is None else passes
+        item.b = item.estimate()
+        _place(qid, item)
+
+
+def seed(counts: Iterable[Tuple[str, int, int]]):
+    """Bulk-load (qid, attempts, passes) from the metrics backfill."""
+    for qid, attempts, passes in counts:
+        observe(qid, False, n=attempts, passes=passes)
+
+
+def difficulty(qid: str) -> float:
+    with _LOCK:
+        item = _item(qid)
+        return item.b if item else 0.0
+
+
+def update_theta(theta: float, qid: str, score: float, max_score: float, answered: int) -> float:
+    """One stochastic-gradient step of the ability estimate after a graded answer."""
+    y = score / max_score if max_score else 0.0
+    p = _sigmoid(theta - difficulty(qid))
+    return theta + THETA_STEP / (1.0 + 0.5 * answered) * (y - p)
+
+
+def select(theta: float, asked: Iterable[str]) -> Optional[str]:
+    """Unasked item whose difficulty is closest to theta (max Fisher information for 1PL)."""
+    skip = set(asked)
+    with _LOCK:
+        _ensure_indexed()
+        if not _BIN_KEYS:
+            return None
+        target = round(theta / BIN_WIDTH)
+        hi = bisect.bisect_left(_BIN_KEYS, target)
+        lo = hi - 1
+        # walk bins outwards from theta; each bin is scanned past at most len(asked) items
+        while lo >= 0 or hi < len(_BIN_KEYS):
+            take_hi = lo < 0 or (hi < len(_BIN_KEYS) and _BIN_KEYS[hi] - target <= target - _BIN_KEYS[lo])
+            key = _BIN_KEYS[hi] if take_hi else _BIN_KEYS[lo]
+            for qid in _BINS[key]:
+                if qid not in skip:
+                    return qid
+            if take_hi:
+                hi += 1
+            else:
+                lo -= 1
+    return None
@@ -8,12 +8,106 @@
 
 
 
-import os, json
-from typing import Tuple
+import os, re, json, time, random, threading
+from typing import Callable, Optional, Tuple
+
+from app.services import timings
+
+# ---- client / concurrency settings ----
+LLM_BASE_URL = os.getenv("LLM_BASE_URL") or None           # e.g. a local stub server
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "3"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "15"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.25"))
+LLM_MIN_ATTEMPT_SECS = 0.1  # don't start an attempt with less budget than this
+# Total wall-clock budget per grade (queueing + attempts + backoff) before falling back.
+LLM_BUDGET_SECS = float(os.getenv("LLM_BUDGET_SECS", "20"))
+
+_SEM = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+_T_REQUEST = timings.histogram("llm_request_seconds", "Wall time of single chat-completion attempts")
+_C_RETRIES = timings.counter("llm_retries_total", "Chat-completion attempts retried after a transient error")
+_FALLBACK_HELP = "Text answers scored by the rule-based fallback instead of the LLM"
+_T_FIRST_FEEDBACK = timings.histogram("llm_first_feedback_seconds",
+                                      "Time from a streamed grade's start to its first feedback piece")
+_CLIENT = None
+_CLIENT_KEY = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def _client(key: str):
+    """Process-wide OpenAI client over one pooled HTTP connection pool."""
+    global _CLIENT, _CLIENT_KEY
+    if _CLIENT is not None and _CLIENT_KEY == key:
+        return _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None or _CLIENT_KEY != key:
+            import httpx
+            from openai import OpenAI
+            http = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONCURRENCY,
+                    max_keepalive_connections=LLM_MAX_CONCURRENCY,
+                ),
+                timeout=httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+            )
+            if _CLIENT is not None:
+                _CLIENT.close()
+            # retries are ours (jittered, budget-aware), not the SDK's
+            _CLIENT = OpenAI(api_key=key, base_url=LLM_BASE_URL, http_client=http, max_retries=0)
+            _CLIENT_KEY = key
+    return _CLIENT
+
+
+def _timeout(remaining: float):
+    """Per-call timeout: the client's read/connect limits, each capped by the budget left."""
+    import httpx
+    left = max(remaining, 0.001)
+    return httpx.Timeout(min(LLM_READ_TIMEOUT, left), connect=min(LLM_CONNECT_TIMEOUT, left))
+
+
+def close():
+    """Release pooled connections (call on shutdown)."""
+    global _CLIENT, _CLIENT_KEY
+    with _CLIENT_LOCK:
+        if _CLIENT is not None:
+            _CLIENT.close()
+        _CLIENT = _CLIENT_KEY = None
+
+
+def _retryable(e: Exception) -> bool:
+    import openai
+    return isinstance(e, (openai.APITimeoutError, openai.APIConnectionError,
+                          openai.RateLimitError, openai.InternalServerError))
+
+
+def _backoff(attempt: int, remaining: float) -> Optional[float]:
+    """Full-jitter exponential backoff; None if it would not leave time for another attempt."""
+    delay = random.uniform(0, LLM_BACKOFF_BASE * (2 ** attempt))
+    return delay if delay + LLM_MIN_ATTEMPT_SECS < remaining else None
+
+
+def _messages(question: dict, answer_text: str):
+    payload = {
+        "rubric": question.get("rubric", []),
+        "answer": answer_text,
+        "return_format": {
+            "score": "0-5 (number)",
+            "reasons": "list of 1-3 short bullets",
+            "tags": "list of short labels"
+        }
+    }
+    return [
+        {"role": "system", "content": "You are a strict Excel evaluator. Return ONLY valid JSON."},
+        {"role": "user", "content": json.dumps(payload)}
+    ]
+
 
 def evaluate_text_with_rubric(question: dict, answer_text: str) -> Tuple[float, str, bool]:
     """
     Uses OpenAI if OPENAI_API_KEY is set; otherwise falls back to rule-based scoring.
+    Calls share one pooled client, are capped at LLM_MAX_CONCURRENCY in flight, and are
+    retried with jittered backoff until LLM_BUDGET_SECS runs out, then fall back.
     Returns: (score: float, feedback: str, is_pass: bool)
     """
     max_score = float(question.get("max_score", 5))
@@ -22,31 +116,36 @@ def evaluate_text_with_rubric(question: dict, answer_text: str) -> Tuple[float,
 
     # If no key -> fallback
     if not key:
+        timings.counter("llm_fallbacks_total", _FALLBACK_HELP, reason="no_key").inc()
         return _fallback_rule_based(answer_text, max_score, "no OpenAI key")
 
+    deadline = time.monotonic() + LLM_BUDGET_SECS
+    if not _SEM.acquire(timeout=LLM_BUDGET_SECS):
+        timings.counter("llm_fallbacks_total", _FALLBACK_HELP, reason="busy").inc()
+        return _fallback_rule_based(answer_text, max_score, "LLM busy")
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=key)
-
-        payload = {
-            "rubric": question.get("rubric", []),
-            "answer": answer_text,
-            "return_format": {
-                "score": "0-5 (number)",
-                "reasons": "list of 1-3 short bullets",
-                "tags": "list of short labels"
-            }
-        }
-
-        resp = client.chat.completions.create(
-            model=model,
-            temperature=0,
-            response_format={"type": "json_object"},   # force JSON
-            messages=[
-                {"role": "system", "content": "You are a strict Excel evaluator. Return ONLY valid JSON."},
-                {"role": "user", "content": json.dumps(payload)}
-            ],
-        )
+        client = _client(key)
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                with _T_REQUEST.time():
+                    resp = client.chat.completions.create(
+                        model=model,
+                        temperature=0,
+                        response_format={"type": "json_object"},   # force JSON
+                        messages=_messages(question, answer_text),
+                        timeout=_timeout(remaining),
+                    )
+                break
+            except Exception as e:
+                remaining = deadline - time.monotonic()
+                delay = _backoff(attempt, remaining) if _retryable(e) and attempt < LLM_MAX_RETRIES else None
+                if delay is None:
+                    raise
+                _C_RETRIES.inc()
+                time.sleep(delay)
+                attempt += 1
 
         content = resp.choices[0].message.content or "{}"
         data = json.loads(content)
@@ -59,11 +158,159 @@ def evaluate_text_with_rubric(question: dict, answer_text: str) -> Tuple[float,
 
     except Exception as e:
         # Any API/JSON issue -> safe fallback
+        timings.counter("llm_fallbacks_total", _FALLBACK_HELP, reason="error").inc()
         return _fallback_rule_based(answer_text, max_score, f"LLM error: {e}")
+    finally:
+        _SEM.release()
+
+# ---- streaming variant (POST /answer/stream) ----
+# JSON cannot be shown while half-written, so the streamed prompt asks for plain-text bullets
+# followed by a SCORE line; bullets are relayed as they arrive and the score line is held back.
+_STREAM_SYSTEM = ("You are a strict Excel evaluator. Reply in plain text: 1-3 short feedback bullets, "
+                  "one per line starting with '- ', then a last line 'SCORE: <number 0-5>'.")
+_SCORE_LINE = re.compile(r"\s*SCORE\s*:?\s*([0-9]+(?:\.[0-9]+)?)(?:\s*/\s*[0-9]+)?\s*$", re.IGNORECASE)
+
+Emit = Callable[[str, dict], None]
+
+
+def _stream_messages(question: dict, answer_text: str):
+    payload = {"rubric": question.get("rubric", []), "answer": answer_text}
+    return [
+        {"role": "system", "content": _STREAM_SYSTEM},
+        {"role": "user", "content": json.dumps(payload)}
+    ]
+
+
+class _FeedbackRelay:
+    """Splits streamed model text into feedback (emitted as it arrives) and the SCORE line."""
+    __slots__ = ("emit", "t0", "pending", "passthrough", "feedback", "score")
+
+    def __init__(self, emit: Emit, t0: float):
+        self.emit = emit
+        self.t0 = t0
+        self.pending = ""         # start of a line that may still turn out to be the score
+        self.passthrough = False  # current line is feedback: relay the rest of it directly
+        self.feedback = []
+        self.score: Optional[float] = None
+
+    @property
+    def started(self) -> bool:
+        return bool(self.feedback)
+
+    def _out(self, text: str):
+        if not text:
+            return
+        if not self.feedback:
+            _T_FIRST_FEEDBACK.observe(time.perf_counter() - self.t0)
+        self.feedback.append(text)
+        self.emit("feedback", {"delta": text})
+
+    def _line(self, line: str):
+        m = _SCORE_LINE.match(line)
+        if m:
+            self.score = float(m.group(1))
+        else:
+            self._out(line)
+
+    def feed(self, text: str):
+        while text:
+            part, nl, text = text.partition("\n")
+            if self.passthrough:
+                self._out(part + nl)
+                self.passthrough = not nl
+                continue
+            self.pending += part + nl
+            if nl:
+                line, self.pending = self.pending, ""
+                self._line(line)
+            elif not "SCORE".startswith(self.pending.lstrip().upper()[:5]):
+                self._out(self.pending)
+                self.pending, self.passthrough = "", True
+
+    def close(self) -> str:
+        """Flush the last line; returns the feedback text (raises if no score was given)."""
+        if self.pending:
+            self._line(self.pending)
+            self.pending = ""
+        if self.score is None:
+            raise ValueError("no SCORE line in the streamed reply")
+        return "".join(self.feedback).strip() or "LLM-graded."
+
+
+def stream_text_with_rubric(question: dict, answer_text: str, emit: Emit) -> Tuple[float, str, bool]:
+    """
+    evaluate_text_with_rubric, streamed: calls emit("feedback", {"delta": text}) for each piece of
+    rubric feedback as the model writes it (from a worker thread). Errors before the first piece
+    are retried like the JSON call; after it, or once LLM_BUDGET_SECS is spent, the answer is
+    scored rule-based and emit("fallback", {"reason": ...}) tells the client to drop the partial text.
+    """
+    max_score = float(question.get("max_score", 5))
+    key = os.getenv("OPENAI_API_KEY", "")
+    model = os.getenv("LLM_MODEL", "gpt-4o-mini")
+
+    def fallback(reason: str, note: str):
+        timings.counter("llm_fallbacks_total", _FALLBACK_HELP, reason=reason).inc()
+        emit("fallback", {"reason": note})
+        return _fallback_rule_based(answer_text, max_score, note)
+
+    if not key:
+        return fallback("no_key", "no OpenAI key")
+
+    deadline = time.monotonic() + LLM_BUDGET_SECS
+    if not _SEM.acquire(timeout=LLM_BUDGET_SECS):
+        return fallback("busy", "LLM busy")
+    t0 = time.perf_counter()
+    relay = _FeedbackRelay(emit, t0)
+    try:
+        client = _client(key)
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            relay = _FeedbackRelay(emit, t0)  # fresh per attempt: no score or half line carried over
+            try:
+                with _T_REQUEST.time():
+                    with client.chat.completions.create(
+                        model=model,
+                        temperature=0,
+                        stream=True,
+                        messages=_stream_messages(question, answer_text),
+                        timeout=_timeout(remaining),
+                    ) as stream:
+                        for chunk in stream:
+                            if time.monotonic() > deadline:
+                                raise TimeoutError(f"no complete reply within {LLM_BUDGET_SECS:g}s")
+                            if chunk.choices and chunk.choices[0].delta.content:
+                                relay.feed(chunk.choices[0].delta.content)
+                break
+            except Exception as e:
+                remaining = deadline - time.monotonic()
+                retry = _retryable(e) and attempt < LLM_MAX_RETRIES and not relay.started
+                delay = _backoff(attempt, remaining) if retry else None
+                if delay is None:
+                    raise
+                _C_RETRIES.inc()
+                time.sleep(delay)
+                attempt += 1
+
+        feedback = relay.close()
+        score = max(0.0, min(relay.score, max_score))
+        return score, feedback, score >= max_score * 0.6
+
+    except Exception as e:
+        return fallback("stream_error" if relay.started else "error", f"LLM error: {e}")
+    finally:
+        _SEM.release()
+
+
+_FALLBACK_FEEDBACK = "Rule-based scoring"
+
+def is_fallback(feedback: str) -> bool:
+    """True for feedback from the rule-based fallback rather than the LLM."""
+    return feedback.startswith(_FALLBACK_FEEDBACK)
 
 def _fallback_rule_based(text: str, max_score: float, note: str = None):
     t = (text or "").lower()
     hits = sum(1 for kw in ["absolute", "$", "anchor", "table", "structured reference", "named range"] if kw in t)
     score = min(max_score, 1.0 + hits)
-    fb = "Rule-based scoring" + (f" ({note})" if note else " (no OpenAI key).")
+    fb = _FALLBACK_FEEDBACK + (f" ({note})" if note else " (no OpenAI key).")
     return score, fb, score >= max_score * 0.6
@@ -0,0 +1,213 @@
+import math, time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.db import engine, Answer, AnswerStat
+from app.questions.bank import question_meta
+
+# Aggregates live in the answer_stats table, so every worker and regrade see the same numbers:
+# per question one running total (bucket 0) and one row per minute of the last RETENTION for the
+# windows. Writers fold their rows in within the same transaction as the rows themselves; minute
+# rows that left the windows are deleted now and then.
+BUCKET_SECS = 60
+RETENTION_SECS = 24 * 3600
+COMPACT_SECS = 600
+WINDOWS = {"last_hour": 3600, "last_day": 24 * 3600}
+PASS_RATIO = 0.6  # same pass line as the graders (score >= 60% of max)
+_TOTAL, _MARKER = 0, -1
+_SUMS = ("count", "total", "sumsq", "passes")
+
+
+class _Agg:
+    __slots__ = ("count", "total", "sumsq", "passes")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.sumsq = 0.0
+        self.passes = 0
+
+    def add(self, score: float, passed: bool, n: int = 1):
+        self.count += n
+        self.total += score * n
+        self.sumsq += score * score * n
+        self.passes += n if passed else 0
+
+    def merge(self, other: "_Agg"):
+        self.count += other.count
+        self.total += other.total
+        self.sumsq += other.sumsq
+        self.passes += other.passes
+
+    def to_dict(self) -> Dict[str, Any]:
+        n = self.count
+        mean = self.total / n if n else 0.0
+        var = max(0.0, self.sumsq / n - mean * mean) if n else 0.0
+        return {"count": n, "avg": round(mean, 2), "stddev": round(math.sqrt(var), 2),
+                "pass_rate": round(self.passes / n, 3) if n else 0.0}
+
+    def values(self) -> Dict[str, Any]:
+        return {k: getattr(self, k) for k in _SUMS}
+
+
+_LAST_COMPACT = [0.0]
+
+
+def _classify(qid: str, score: float):
+    q = question_meta(qid)
+    if not q:
+        return None, False
+    return q.get("skill", "general"), score >= PASS_RATIO * float(q.get("max_score", 5))
+
+
+def _score(value) -> float:
+    try:
+        return float(value or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _minute(created: Optional[datetime], now: float) -> Optional[int]:
+    """Minute bucket of a naive-UTC timestamp; None once it is past the windows."""
+    if created is None:
+        return None
+    ts = created.replace(tzinfo=timezone.utc).timestamp()
+    return int(ts // BUCKET_SECS) if ts >= now - RETENTION_SECS else None
+
+
+def _add(deltas: Dict[Tuple[str, int], "_Agg"], qid: str, score, created: Optional[datetime], now: float,
+         n: int = 1):
+    s = _score(score)
+    passed = _classify(qid, s)[1]
+    deltas[(qid, _TOTAL)].add(s, passed, n)
+    minute = _minute(created, now)
+    if minute is not None:
+        deltas[(qid, minute)].add(s, passed, n)
+
+
+def _upsert(conn, deltas: Dict[Tuple[str, int], _Agg]):
+    rows = [{"question_id": qid, "bucket": b, **a.values()} for (qid, b), a in deltas.items()]
+    if not rows:
+        return
+    name = conn.dialect.name
+    if name in ("sqlite", "postgresql"):
+        if name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        ins = insert(AnswerStat)
+        conn.execute(ins.on_conflict_do_update(
+            index_elements=["question_id", "bucket"],
+            set_={k: getattr(AnswerStat, k) + getattr(ins.excluded, k) for k in _SUMS}), rows)
+        return
+    for row in rows:  # other databases: update, insert when the row is new
+        key = (AnswerStat.question_id == row["question_id"]) & (AnswerStat.bucket == row["bucket"])
+        done = conn.execute(update(AnswerStat).where(key).values(
+            **{k: getattr(AnswerStat, k) + row[k] for k in _SUMS})).rowcount
+        if not done:
+            conn.execute(AnswerStat.__table__.insert(), [row])
+
+
+def fold(conn, rows: Iterable[Tuple[str, Any, Optional[datetime], int]]):
+    """Add (qid, score, created_at, sign) rows to the aggregates inside the caller's transaction;
+    sign -1 takes a row back out (e.g. its old score on regrade)."""
+    now = time.time()
+    deltas: Dict[Tuple[str, int], _Agg] = defaultdict(_Agg)
+    for qid, score, created, sign in rows:
+        _add(deltas, qid, score, created, now, sign)
+    _upsert(conn, deltas)
+    if now - _LAST_COMPACT[0] >= COMPACT_SECS:
+        _LAST_COMPACT[0] = now
+        # the totals already hold these rows: expired minutes are simply dropped
+        first = int((now - RETENTION_SECS) // BUCKET_SECS)
+        conn.execute(delete(AnswerStat).where(AnswerStat.bucket > _TOTAL, AnswerStat.bucket < first))
+
+
+def backfill():
+    """Fold answers stored before the aggregates table existed, once per database."""
+    marker = select(AnswerStat.bucket).where(AnswerStat.bucket == _MARKER).limit(1)
+    with engine.connect() as conn:
+        if conn.execute(marker).first():
+            return
+    try:
+        with engine.begin() as conn:
+            # claiming the marker takes the write lock (SQLite); on PostgreSQL keep writers out
+            # until this commits, so rows they add are folded by them, not counted twice
+            conn.execute(AnswerStat.__table__.insert(), [{"question_id": "", "bucket": _MARKER}])
+            if conn.dialect.name == "postgresql":
+                conn.execute(text("LOCK TABLE answers IN SHARE MODE"))
+            now = time.time()
+            since = datetime.fromtimestamp(now - RETENTION_SECS, timezone.utc).replace(tzinfo=None)
+            deltas: Dict[Tuple[str, int], _Agg] = defaultdict(_Agg)
+            # scores take few distinct values, so (question, score) groups stay small
+            for qid, score, n in conn.execute(
+                select(Answer.question_id, Answer.score, func.count())
+                .where(Answer.created_at < since).group_by(Answer.question_id, Answer.score)
+            ):
+                _add(deltas, qid, score, None, now, n)
+            recent = conn.execution_options(stream_results=True, yield_per=5000).execute(
+                select(Answer.question_id, Answer.score, Answer.created_at).where(Answer.created_at >= since))
+            for qid, score, created in recent:
+                _add(deltas, qid, score, created, now)
+            _upsert(conn, deltas)
+    except (IntegrityError, OperationalError):
+        pass  # another worker claimed the marker (or still holds the lock while folding them)
+
+
+_SUM_COLS = tuple(func.sum(getattr(AnswerStat, k)) for k in _SUMS)
+
+
+def _agg(n, total, sumsq, passes) -> _Agg:
+    agg = _Agg()
+    agg.count, agg.total, agg.sumsq, agg.passes = int(n or 0), float(total or 0.0), float(sumsq or 0.0), int(passes or 0)
+    return agg
+
+
+def question_counts():
+    """(qid, attempts, passes) per question, e.g. to seed item statistics."""
+    with engine.connect() as conn:
+        return [(qid, int(n or 0), int(p or 0)) for qid, n, p in conn.execute(
+            select(AnswerStat.question_id, AnswerStat.count, AnswerStat.passes).where(AnswerStat.bucket == _TOTAL))]
+
+
+def _window(per: Dict[str, _Agg]) -> Dict[str, Any]:
+    total = _Agg()
+    for agg in per.values():
+        total.merge(agg)
+    return {"total_answers": total.count, "avg_score": total.to_dict()["avg"],
+            "per_skill_avg": {k: v.to_dict()["avg"] for k, v in per.items()}}
+
+
+def snapshot() -> Dict[str, Any]:
+    """Everything /admin/metrics reports: the per-question totals plus one GROUP BY per window
+    over the minute rows, whatever the size of the answers table."""
+    now = time.time()
+    all_, skills, questions = _Agg(), defaultdict(_Agg), {}
+    windows = {name: defaultdict(_Agg) for name in WINDOWS}
+    cols = [getattr(AnswerStat, k) for k in _SUMS]
+    with engine.connect() as conn:
+        for qid, *sums in conn.execute(select(AnswerStat.question_id, *cols).where(AnswerStat.bucket == _TOTAL)):
+            agg = questions[qid] = _agg(*sums)
+            all_.merge(agg)
+            skill = _classify(qid, 0.0)[0]
+            if skill is not None:
+                skills[skill].merge(agg)
+        for name, secs in WINDOWS.items():
+            first = int((now - secs) // BUCKET_SECS)
+            for qid, *sums in conn.execute(select(AnswerStat.question_id, *_SUM_COLS)
+                                           .where(AnswerStat.bucket > first).group_by(AnswerStat.question_id)):
+                skill = _classify(qid, 0.0)[0]
+                if skill is not None:
+                    windows[name][skill].merge(_agg(*sums))
+    return {
+        "total_answers": all_.count,
+        "avg_score": all_.to_dict()["avg"],
+        "per_skill_avg": {k: v.to_dict()["avg"] for k, v in skills.items()},
+        "per_skill": {k: v.to_dict() for k, v in skills.items()},
+        "per_question": {k: v.to_dict() for k, v in questions.items()},
+        "windows": {name: _window(per) for name, per in windows.items()},
+    }
@@ -0,0 +1,254 @@
+import os, json, time, atexit, logging, threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError, StatementError
+
+from app.db import engine, Interview, Answer
+from app.services import timings, metrics
+
+# Write-behind buffer: rows are flushed when BATCH_SIZE is reached or FLUSH_SECS elapse.
+# While the database is unavailable rows stay buffered, up to MAX_BUFFER; past that, callers
+# wait up to BLOCK_SECS for room and then write their row themselves, after the buffered rows
+# of the same interview and in one transaction with them (raising if that fails).
+# A batch rejected because of its rows (constraint/type errors) is retried MAX_RETRIES times,
+# then written in halves until the bad rows are alone; those go to DEAD_LETTER (JSON lines).
+PERSIST_BATCH_SIZE = int(os.getenv("PERSIST_BATCH_SIZE", "200"))
+PERSIST_FLUSH_SECS = float(os.getenv("PERSIST_FLUSH_SECS", "0.5"))
+PERSIST_MAX_BUFFER = int(os.getenv("PERSIST_MAX_BUFFER", "20000"))
+PERSIST_BLOCK_SECS = float(os.getenv("PERSIST_BLOCK_SECS", "5"))
+PERSIST_MAX_RETRIES = int(os.getenv("PERSIST_MAX_RETRIES", "3"))
+PERSIST_DEAD_LETTER = os.getenv("PERSIST_DEAD_LETTER", "persist.deadletter.jsonl")
+
+_BUF: List[Tuple[Any, Dict[str, Any]]] = []
+_COND = threading.Condition()
+_WRITE_LOCK = threading.Lock()  # one buffered write at a time, so batches commit in buffer order
+_THREAD = None
+_STOP = False
+_FAILS = [0]  # consecutive row-caused failures of the batch at the head of the buffer
+_INFLIGHT = [0]  # rows taken out of the buffer by a write in progress (still count toward the cap)
+_T_FLUSH = timings.histogram("persist_flush_seconds", "Write-behind batch commit time")
+_C_DEAD = timings.counter("persist_dead_letter_total", "Rows the database rejected, written to the dead-letter file")
+_LOG = logging.getLogger("app.persist")
+_STATS = {"enqueued": 0, "flushed_rows": 0, "batches": 0, "errors": 0, "dead_lettered": 0, "blocked": 0,
+          "sync_writes": 0, "last_flush_ms": 0.0, "max_flush_ms": 0.0, "total_flush_ms": 0.0}
+
+
+def _now():
+    # naive UTC, same as SQLite CURRENT_TIMESTAMP (the server default)
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _enqueue(table, row: Dict[str, Any]):
+    global _THREAD
+    with _COND:
+        if _THREAD is None:
+            _THREAD = threading.Thread(target=_run, name="persist-flusher", daemon=True)
+            _THREAD.start()
+        if len(_BUF) + _INFLIGHT[0] >= PERSIST_MAX_BUFFER:  # backpressure: let the flusher catch up
+            _STATS["blocked"] += 1
+            _COND.notify_all()
+            deadline = time.monotonic() + PERSIST_BLOCK_SECS
+            while len(_BUF) + _INFLIGHT[0] >= PERSIST_MAX_BUFFER and time.monotonic() < deadline:
+                _COND.wait(deadline - time.monotonic())
+        if len(_BUF) + _INFLIGHT[0] < PERSIST_MAX_BUFFER:
+            _BUF.append((table, row))
+            _STATS["enqueued"] += 1
+            if len(_BUF) >= PERSIST_BATCH_SIZE:
+                _COND.notify_all()
+            return
+        _STATS["sync_writes"] += 1
+    _write_through(table, row)  # still full (raises if the database is down)
+
+
+def _interview_of(table, row: Dict[str, Any]):
+    return row.get("id") if table is Interview.__table__ else row.get("interview_id")
+
+
+def _write_through(table, row: Dict[str, Any]):
+    """Write one row directly, in one transaction with (after) the buffered rows of its interview,
+    so an answer never commits ahead of its interview row."""
+    iid = _interview_of(table, row)
+    with _WRITE_LOCK:  # no flush in flight: every unwritten row is in _BUF
+        with _COND:
+            ahead = [r for r in _BUF if _interview_of(*r) == iid]
+            if ahead:
+                _BUF[:] = [r for r in _BUF if _interview_of(*r) != iid]
+        try:
+            _write(ahead + [(table, row)])
+        except Exception:
+            with _COND:
+                _BUF[:0] = ahead
+            raise
+    with _COND:
+        _STATS["flushed_rows"] += len(ahead)
+
+
+def add_interview(iid: str, email):
+    _enqueue(Interview.__table__, {"id": iid, "candidate_email": email, "created_at": None})
+
+
+def add_answer(iid: str, qid: str, score: float, feedback: str, answer_text: str, answer_table_json):
+    _enqueue(Answer.__table__, {
+        "interview_id": iid,
+        "question_id": qid,
+        "score": score,
+        "feedback": feedback,
+        "answer_text": answer_text,
+        "answer_table_json": answer_table_json,
+        "created_at": None,  # stamped by _write
+    })
+
+
+def _write(batch: List[Tuple[Any, Dict[str, Any]]]):
+    """One transaction per batch; one compiled INSERT per table, executed for all its rows.
+    Answer rows are folded into the metrics aggregates in the same transaction.
+    created_at is stamped here, at write time, not when the row was queued: a row then
+    commits within moments of its timestamp, which is what export watermarks rely on."""
+    by_table: Dict[Any, List[Dict[str, Any]]] = {}
+    for table, row in batch:
+        by_table.setdefault(table, []).append(row)
+    with engine.begin() as conn:
+        stamp = _now()
+        for _, row in batch:
+            row["created_at"] = stamp  # a retried row is restamped
+        # interviews first so answer rows never precede their interview
+        for table in sorted(by_table, key=lambda t: t is not Interview.__table__):
+            # executemany reuses one prepared statement; a literal multi-VALUES
+            # insert recompiles per chunk and measured ~15x slower on SQLite
+            conn.execute(insert(table), by_table[table])
+        answers = by_table.get(Answer.__table__)
+        if answers:
+            metrics.fold(conn, ((r["question_id"], r["score"], r["created_at"], 1) for r in answers))
+
+
+def _row_error(e: Exception) -> bool:
+    """Rejected because of the rows themselves (constraint, type, binding), not the connection."""
+    return isinstance(e, StatementError) and not isinstance(e, OperationalError)
+
+
+def _dead_letter(table, row: Dict[str, Any], e: Exception):
+    _LOG.error("persist: dropping a row the database rejected (%s): %s", table.name, e)
+    with _COND:
+        _STATS["dead_lettered"] += 1
+    _C_DEAD.inc()
+    try:
+        with open(PERSIST_DEAD_LETTER, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"table": table.name, "row": row, "error": str(e).splitlines()[0],
+                                "at": _now().isoformat()}, default=str) + "\n")
+    except OSError as err:
+        _LOG.error("persist: cannot write dead-letter file %s: %s", PERSIST_DEAD_LETTER, err)
+
+
+def _isolate(batch: List[Tuple[Any, Dict[str, Any]]]) -> Tuple[List[Tuple[Any, Dict[str, Any]]], int]:
+    """Write `batch` in halves until each failing row is alone, dead-lettering those.
+    Returns (rows left unwritten, in order, if the database itself fails meanwhile; rows dropped)."""
+    todo, dead = [batch], 0
+    while todo:
+        rows = todo.pop()
+        try:
+            _write(rows)
+        except Exception as e:
+            if not _row_error(e):
+                return rows + [r for chunk in reversed(todo) for r in chunk], dead
+            if len(rows) == 1:
+                _dead_letter(rows[0][0], rows[0][1], e)
+                dead += 1
+            else:
+                mid = len(rows) // 2
+                todo += [rows[mid:], rows[:mid]]  # first half is written first
+    return [], dead
+
+
+def _flush_once() -> int:
+    with _WRITE_LOCK:
+        return _flush_locked()
+
+
+def _flush_locked() -> int:
+    with _COND:
+        batch = _BUF[:]
+        _BUF.clear()
+        _INFLIGHT[0] = len(batch)
+    if not batch:
+        return 0
+    t0 = time.perf_counter()
+    dead = 0
+    try:
+        _write(batch)
+    except Exception as e:
+        row_error = _row_error(e)
+        with _COND:
+            _INFLIGHT[0] = 0
+            _STATS["errors"] += 1
+            _FAILS[0] = _FAILS[0] + 1 if row_error else 0
+            isolate = row_error and _FAILS[0] > PERSIST_MAX_RETRIES
+            if not isolate:
+                _BUF[:0] = batch  # keep order; retried on the next trigger
+        if not isolate:
+            raise
+        left, dead = _isolate(batch)
+        with _COND:
+            _FAILS[0] = 0
+            _BUF[:0] = left
+        if left:
+            raise
+    ms = (time.perf_counter() - t0) * 1000.0
+    _T_FLUSH.observe(ms / 1000.0)
+    with _COND:
+        _FAILS[0] = 0
+        _INFLIGHT[0] = 0
+        _COND.notify_all()  # room for callers waiting on a full buffer
+        _STATS["batches"] += 1
+        _STATS["flushed_rows"] += len(batch) - dead
+        _STATS["last_flush_ms"] = ms
+        _STATS["max_flush_ms"] = max(_STATS["max_flush_ms"], ms)
+        _STATS["total_flush_ms"] += ms
+    return len(batch)
+
+
+def _run():
+    while True:
+        with _COND:
+            if not _STOP and len(_BUF) < PERSIST_BATCH_SIZE:
+                _COND.wait(PERSIST_FLUSH_SECS)
+            stopping = _STOP
+        try:
+            _flush_once()
+        except Exception:
+            time.sleep(PERSIST_FLUSH_SECS)  # DB unavailable: back off, rows stay buffered
+        if stopping:
+            return
+
+
+def flush():
+    """Synchronously write everything buffered so far."""
+    while _flush_once():
+        pass
+
+
+def shutdown():
+    """Stop the flusher and drain the buffer (safe to call more than once)."""
+    global _THREAD, _STOP
+    with _COND:
+        t, _STOP = _THREAD, True
+        _COND.notify()
+    if t is not None:
+        t.join()
+    flush()
+    with _COND:
+        _THREAD, _STOP = None, False
+
+
+atexit.register(shutdown)
+
+
+def stats() -> Dict[str, Any]:
+    with _COND:
+        out = dict(_STATS, queue_depth=len(_BUF))
+    total = out.pop("total_flush_ms")
+    out["avg_flush_ms"] = round(total / out["batches"], 3) if out["batches"] else 0.0
+    out["last_flush_ms"] = round(out["last_flush_ms"], 3)
+    out["max_flush_ms"] = round(out["max_flush_ms"], 3)
+    return out
@@ -1,15 +1,37 @@
-from typing import Dict, Any
-from collections import defaultdict
-from app.questions.bank import get_question_by_id
-def generate_report(itv: Dict[str, Any]):
-    scores=itv.get('scores',[]); total=0.0; skill_totals=defaultdict(float); skill_max=defaultdict(float)
-    for s in scores:
-        q=get_question_by_id(s['qid']); 
-        if not q: continue
-        skill=q.get('skill','general'); total+=s['score']; skill_totals[skill]+=s['score']; skill_max[skill]+=q.get('max_score',5)
-    overall_max=sum(skill_max.values()) or 1.0; pct=100.0*total/overall_max
+import os, threading
+from collections import OrderedDict
+from app.services.session_store import InterviewRecord
+# Summaries come from the record's running per-skill totals and are memoized per interview
+# until its `rev` changes (a new answer or grade); raw answers are attached per request.
+REPORT_CACHE_SIZE=int(os.getenv("REPORT_CACHE_SIZE","4096"))
+_CACHE:"OrderedDict[str,tuple]"=OrderedDict(); _LOCK=threading.Lock(); _STATS={'hits':0,'misses':0}
+def _summary(itv: InterviewRecord):
+    acc=itv.skill_acc; total=sum(v[0] for v in acc.values())
+    overall_max=sum(v[1] for v in acc.values()) or 1.0; pct=100.0*total/overall_max
     band='Advanced' if pct>=85 else 'Intermediate' if pct>=65 else 'Beginner'
-    strengths=[k for k,v in skill_totals.items() if 100.0*v/(skill_max[k] or 1.0)>=75]
-    gaps=[k for k,v in skill_totals.items() if 100.0*v/(skill_max[k] or 1.0)<55]
+    per={k:100.0*v[0]/(v[1] or 1.0) for k,v in acc.items()}
+    strengths=[k for k,v in per.items() if v>=75]; gaps=[k for k,v in per.items() if v<55]
     drills=[f"Practice more on: {', '.join(gaps)}"] if gaps else []
-    return {'total_score':round(total,2),'overall_percent':round(pct,1),'band':band,'per_skill':{k:round(100.0*v/(skill_max[k] or 1.0),1) for k,v in skill_totals.items()},'strengths':strengths,'gaps':gaps,'drills':drills,'answers':itv.get('answers',[]),'scores':scores}
+    return {'total_score':round(total,2),'overall_percent':round(pct,1),'band':band,'per_skill':{k:round(v,1) for k,v in per.items()},'strengths':strengths,'gaps':gaps,'drills':drills,'pending':itv.pending,'complete':itv.pending==0}
+def summary(itv: InterviewRecord):
+    """Score summary without raw answers; O(skills), memoized until the interview changes."""
+    with _LOCK:
+        hit=_CACHE.get(itv.id)
+        if hit and hit[0]==itv.rev: _CACHE.move_to_end(itv.id); _STATS['hits']+=1; return hit[1]
+    out=_summary(itv)
+    with _LOCK:
+        _CACHE[itv.id]=(itv.rev,out); _CACHE.move_to_end(itv.id); _STATS['misses']+=1
+        while len(_CACHE)>REPORT_CACHE_SIZE: _CACHE.popitem(last=False)
+    return out
+def generate_report(itv: InterviewRecord, answers: str='all', offset: int=0, limit=None):
+    """Summary plus raw answers/scores: answers='all' (default), 'none', or a page via offset/limit."""
+    out=dict(summary(itv))
+    if answers=='none': return out
+    n=len(itv.answers); lo=max(0,offset); hi=n if limit is None else min(n,lo+max(0,limit))
+    if lo==0 and hi==n: out['answers']=itv.answers_json(); out['scores']=itv.scores_json()
+    else:
+        out['answers']=[{"qid":q,"answer_text":t,"answer_table":tab} for q,t,tab in itv.answers[lo:hi]]
+        out['scores']=[s.to_dict() for s in itv.scores[lo:hi]]; out['answers_total']=n; out['offset']=lo
+    return out
+def stats():
+    with _LOCK: return dict(_STATS,cached=len(_CACHE))
@@ -0,0 +1,204 @@
+import os, json, time, sqlite3, threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# Backend: "memory" (per process) or "sqlite" (shared by every worker on the box).
+SESSION_STORE = os.getenv("SESSION_STORE", "memory").lower()
+SESSION_DB = os.getenv("SESSION_DB", "./sessions.db")
+SESSION_TTL_SECS = float(os.getenv("SESSION_TTL_SECS", str(6 * 3600)))  # idle time before eviction
+SESSION_MAX = int(os.getenv("SESSION_MAX", "10000"))                     # LRU cap
+
+
+class ScoreEntry:
+    __slots__ = ("qid", "raw_score", "final_score", "feedback", "hints_used", "status")
+
+    def __init__(self, qid, raw_score=None, final_score=None, feedback="", hints_used=0, status="pending"):
+        self.qid = qid
+        self.raw_score = raw_score
+        self.final_score = final_score
+        self.feedback = feedback
+        self.hints_used = hints_used
+        self.status = status  # "pending" | "graded"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"qid": self.qid, "raw_score": self.raw_score, "final_score": self.final_score,
+                "feedback": self.feedback, "hints_used": self.hints_used, "status": self.status}
+
+
+class InterviewRecord:
+    """Compact per-interview state; answers are (qid, text, table) tuples aligned with scores."""
+    __slots__ = ("id", "candidate_email", "created_at", "touched", "asked", "hints", "answers", "scores",
+                 "cursors", "theta", "skill_acc", "pending", "rev", "lock")
+
+    def __init__(self, iid: str, candidate_email: Optional[str] = None, created_at: Optional[float] = None):
+        self.id = iid
+        self.candidate_email = candidate_email
+        self.created_at = created_at if created_at is not None else time.time()
+        self.touched = self.created_at
+        self.asked: List[str] = []           # question ids, in order asked
+        self.hints: Dict[str, int] = {}      # qid -> hints used (only qids with hints)
+        self.answers: List[tuple] = []       # (qid, answer_text, answer_table)
+        self.scores: List[ScoreEntry] = []
+        self.cursors: Dict[str, int] = {}    # selection list -> first possibly-unasked position
+        self.theta = 0.0                     # ability estimate (IRT selection mode)
+        self.skill_acc: Dict[str, List[float]] = {}  # skill -> [score total, max total] of graded answers
+        self.pending = 0                     # answers awaiting a grade
+        self.rev = 0                         # bumped on every answer/grade; keys the memoized report
+        self.lock = threading.Lock()         # held by MemoryStore.edit (not serialized)
+
+    def answers_json(self) -> List[Dict[str, Any]]:
+        return [{"qid": q, "answer_text": t, "answer_table": tab} for q, t, tab in self.answers]
+
+    def scores_json(self) -> List[Dict[str, Any]]:
+        return [s.to_dict() for s in self.scores]
+
+    # ---- (de)serialization for shared backends ----
+    def dumps(self) -> str:
+        return json.dumps([
+            self.id, self.candidate_email, self.created_at, self.touched, self.asked, self.hints,
+            [list(a) for a in self.answers],
+            [[s.qid, s.raw_score, s.final_score, s.feedback, s.hints_used, s.status] for s in self.scores],
+            self.cursors, self.theta, self.skill_acc, self.pending, self.rev,
+        ], separators=(",", ":"))
+
+    @classmethod
+    def loads(cls, data: str) -> "InterviewRecord":
+        (iid, email, created, touched, asked, hints, answers, scores,
+         cursors, theta, skill_acc, pending, rev) = json.loads(data)
+        rec = cls(iid, email, created)
+        rec.touched, rec.asked, rec.hints = touched, asked, hints
+        rec.answers = [tuple(a) for a in answers]
+        rec.scores = [ScoreEntry(*s) for s in scores]
+        rec.cursors, rec.theta, rec.skill_acc, rec.pending, rec.rev = cursors, theta, skill_acc, pending, rev
+        return rec
+
+
+class MemoryStore:
+    """Per-process store: OrderedDict in LRU order, idle TTL + size cap evicted on write."""
+
+    def __init__(self, ttl: float = SESSION_TTL_SECS, max_items: int = SESSION_MAX):
+        self.ttl, self.max_items = ttl, max_items
+        self._d: "OrderedDict[str, InterviewRecord]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._d)
+
+    def get(self, iid: str) -> Optional[InterviewRecord]:
+        now = time.time()
+        with self._lock:
+            rec = self._d.get(iid)
+            if rec is None:
+                return None
+            if now - rec.touched > self.ttl:
+                del self._d[iid]
+                return None
+            rec.touched = now
+            self._d.move_to_end(iid)
+            return rec
+
+    def put(self, rec: InterviewRecord):
+        with self._lock:
+            rec.touched = time.time()
+            self._d[rec.id] = rec
+            self._d.move_to_end(rec.id)
+            self._evict(rec.touched)
+
+    @contextmanager
+    def edit(self, iid: str) -> Iterator[InterviewRecord]:
+        rec = self.get(iid)
+        if rec is None:
+            raise KeyError(iid)
+        with rec.lock:  # request threads and background graders edit the same record
+            yield rec
+
+    def _evict(self, now: float) -> int:
+        n = 0
+        while self._d:
+            oldest = next(iter(self._d.values()))
+            if len(self._d) <= self.max_items and now - oldest.touched <= self.ttl:
+                break
+            self._d.popitem(last=False)
+            n += 1
+        return n
+
+    def evict(self) -> int:
+        with self._lock:
+            return self._evict(time.time())
+
+
+class SqliteStore:
+    """Shared store: one row per interview; edits run in BEGIN IMMEDIATE so workers serialize."""
+    _EVICT_EVERY = 256  # writes between eviction sweeps
+
+    def __init__(self, path: str = SESSION_DB, ttl: float = SESSION_TTL_SECS, max_items: int = SESSION_MAX):
+        self.path, self.ttl, self.max_items = path, ttl, max_items
+        self._local = threading.local()
+        self._writes = 0
+        with self._conn() as c:
+            c.execute("CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data TEXT NOT NULL, touched REAL NOT NULL)")
+            c.execute("CREATE INDEX IF NOT EXISTS ix_sessions_touched ON sessions (touched)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def get(self, iid: str) -> Optional[InterviewRecord]:
+        row = self._conn().execute(
+            "SELECT data FROM sessions WHERE id = ? AND touched >= ?", (iid, time.time() - self.ttl)
+        ).fetchone()
+        return InterviewRecord.loads(row[0]) if row else None
+
+    def put(self, rec: InterviewRecord):
+        rec.touched = time.time()
+        self._conn().execute("INSERT OR REPLACE INTO sessions (id, data, touched) VALUES (?, ?, ?)",
+                             (rec.id, rec.dumps(), rec.touched))
+        self._maybe_evict()
+
+    @contextmanager
+    def edit(self, iid: str) -> Iterator[InterviewRecord]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT data FROM sessions WHERE id = ? AND touched >= ?",
+                               (iid, time.time() - self.ttl)).fetchone()
+            if row is None:
+                raise KeyError(iid)
+            rec = InterviewRecord.loads(row[0])
+            yield rec
+            rec.touched = time.time()
+            conn.execute("UPDATE sessions SET data = ?, touched = ? WHERE id = ?", (rec.dumps(), rec.touched, iid))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._maybe_evict()
+
+    def _maybe_evict(self):
+        self._writes += 1
+        if self._writes % self._EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self) -> int:
+        conn = self._conn()
+        n = conn.execute("DELETE FROM sessions WHERE touched < ?", (time.time() - self.ttl,)).rowcount
+        n += conn.execute(
+            "DELETE FROM sessions WHERE id IN (SELECT id FROM sessions ORDER BY touched DESC LIMIT -1 OFFSET ?)",
+            (self.max_items,),
+        ).rowcount
+        return n
+
+
+def make_store():
+    if SESSION_STORE == "sqlite":
+        return SqliteStore()
+    return MemoryStore()
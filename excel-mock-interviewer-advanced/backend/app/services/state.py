@@ -44,14 +44,15 @@
 
 
 
-import uuid, time, json
-from typing import Dict, Any, Optional, List
+import os, uuid, json
+from typing import Dict, Any, List, Optional
 
-from app.questions.bank import get_bank, get_question_by_id
-from app.db import SessionLocal, Interview, Answer
+from app.questions.bank import get_question_by_id, question_meta, question_ids, ids_by_difficulty, generation
+from app.services import persist, irt
+from app.services.session_store import make_store, InterviewRecord, ScoreEntry
 
-# ---- in-memory store ----
-_STORE: Dict[str, Dict[str, Any]] = {}
+# ---- session store (memory or shared SQLite, TTL/LRU evicted) ----
+_STORE = make_store()
 
 # Penalty per hint (points). Change to 0.25 or 1.0 if you prefer.
 HINT_PENALTY = 0.5
@@ -59,57 +60,92 @@ HINT_PENALTY = 0.5
 # Max questions per interview
 MAX_QUESTIONS = 6
 
+# "adaptive" (E/M/H rule below) or "irt" (ability vs. item-difficulty matching)
+SELECTION_MODE = os.getenv("SELECTION_MODE", "adaptive").lower()
 
-def create_interview(email: Optional[str] = None) -> Dict[str, Any]:
-    iid = str(uuid.uuid4())
-    bank = get_bank()
-    qids = [q["id"] for q in bank["questions"]]
-
-    _STORE[iid] = {
-        "id": iid,
-        "candidate_email": email,
-        "created_at": time.time(),
-        "asked": [],              # list[str] of question ids asked (order)
-        "answers": [],            # list of {qid, answer_text, answer_table}
-        "scores": [],             # list of {qid, raw_score, final_score, feedback}
-        "hints": {},              # dict[qid] -> count
-        "question_ids": qids,     # full bank order for selection
-        "meta": {"difficulty": "E"},
-    }
 
-    db = SessionLocal()
-    try:
-        db.add(Interview(id=iid, candidate_email=email))
-        db.commit()
-    finally:
-        db.close()
+def create_interview(email: Optional[str] = None) -> InterviewRecord:
+    itv = InterviewRecord(str(uuid.uuid4()), email)
+    _STORE.put(itv)
+
+    # Persisted write-behind (batched with other rows)
+    persist.add_interview(itv.id, email)
+
+    return itv
 
-    return _STORE[iid]
 
+class DuplicateAnswer(Exception):
+    """The question already has a recorded answer in this interview."""
 
-def get_interview(iid: str) -> Optional[Dict[str, Any]]:
+
+def get_interview(iid: str) -> Optional[InterviewRecord]:
     return _STORE.get(iid)
 
 
+def answered(itv: InterviewRecord, qid: str) -> bool:
+    return any(a[0] == qid for a in itv.answers)
+
+
 def record_hint(iid: str, qid: str):
-    itv = _STORE[iid]
-    itv["hints"][qid] = itv["hints"].get(qid, 0) + 1
+    with _STORE.edit(iid) as itv:
+        itv.hints[qid] = itv.hints.get(qid, 0) + 1
 
 
-def record_answer(iid: str, qid: str, txt, tab, score, fb):
+def record_answer(iid: str, qid: str, txt, tab, score, fb) -> int:
     """
-    Apply hint penalty and persist final_score (DB stores final_score).
+    Apply hint penalty and persist final_score (DB stores final_score; rows are
+    buffered and batch-inserted by services.persist).
     Keep both raw and final in memory for reporting/adaptivity.
+    Pass score=None to record a *pending* answer (graded later via complete_answer).
+    Returns the index of the score entry; raises DuplicateAnswer if `qid` was already answered.
     """
-    itv = _STORE[iid]
+    with _STORE.edit(iid) as itv:
+        if answered(itv, qid):
+            raise DuplicateAnswer(qid)
 
-    # Track the answer text/table
-    itv["answers"].append(
-        {"qid": qid, "answer_text": txt, "answer_table": tab}
-    )
+        # Track the answer text/table
+        itv.answers.append((qid, txt, tab))
+
+        # Hints are counted at submission time, so late grading applies the same penalty
+        entry = ScoreEntry(qid, feedback=fb, hints_used=itv.hints.get(qid, 0))
+        itv.scores.append(entry)
+        itv.pending += 1
+        itv.rev += 1
+
+        if score is not None:
+            _finalize(itv, entry, txt, tab, score, fb)
+        return len(itv.scores) - 1
+
+
+def complete_answer(iid: str, idx: int, score, fb):
+    """Fill in the grade for a pending answer recorded by record_answer(score=None)."""
+    try:
+        with _STORE.edit(iid) as itv:
+            entry = itv.scores[idx]
+            if entry.status != "pending":
+                return
+            _, txt, tab = itv.answers[idx]
+            _finalize(itv, entry, txt, tab, score, fb)
+    except KeyError:
+        pass  # interview evicted before its grade came back
+
+
+def get_score(iid: str, qid: str) -> Optional[ScoreEntry]:
+    """Latest score entry for `qid` (status 'pending' or 'graded')."""
+    itv = _STORE.get(iid)
+    if itv is None:
+        return None
+    for entry in reversed(itv.scores):
+        if entry.qid == qid:
+            return entry
+    return None
+
+
+def _finalize(itv: InterviewRecord, entry: ScoreEntry, txt, tab, score, fb):
+    qid = entry.qid
 
     # Compute hint penalty
-    hints_used = itv["hints"].get(qid, 0)
+    hints_used = entry.hints_used
     raw_score = float(score or 0.0)
     penalty = HINT_PENALTY * hints_used
     final_score = max(0.0, raw_score - penalty)
@@ -118,73 +154,83 @@ def record_answer(iid: str, qid: str, txt, tab, score, fb):
     if hints_used > 0:
         fb = f"{fb} (−{penalty:.1f} for {hints_used} hint{'s' if hints_used!=1 else ''})"
 
-    itv["scores"].append(
-        {"qid": qid, "raw_score": raw_score, "final_score": final_score, "feedback": fb}
+    entry.raw_score, entry.final_score, entry.feedback, entry.status = raw_score, final_score, fb, "graded"
+
+    # Running per-skill totals for the report (no re-scan of scores per request)
+    q = question_meta(qid)
+    max_score = float(q.get("max_score", 5)) if q else 5.0
+    if q:
+        acc = itv.skill_acc.setdefault(q.get("skill", "general"), [0.0, 0.0])
+        acc[0] += final_score
+        acc[1] += max_score
+    itv.pending -= 1
+    itv.rev += 1
+
+    # Item statistics + ability estimate for IRT selection
+    irt.observe(qid, final_score >= irt.PASS_RATIO * max_score)
+    graded = sum(1 for s in itv.scores if s.status == "graded")
+    itv.theta = irt.update_theta(itv.theta, qid, final_score, max_score, graded - 1)
+
+    # Persist final_score to DB (write-behind)
+    persist.add_answer(
+        itv.id,
+        qid,
+        final_score,
+        fb or "",
+        txt or "",
+        json.dumps(tab) if tab else None,
     )
 
-    # Persist final_score to DB
-    db = SessionLocal()
-    try:
-        db.add(
-            Answer(
-                interview_id=iid,
-                question_id=qid,
-                score=final_score,
-                feedback=fb or "",
-                answer_text=txt or "",
-                answer_table_json=json.dumps(tab) if tab else None,
-            )
-        )
-        db.commit()
-    finally:
-        db.close()
-
-
-def _choose_next(iid: str) -> Optional[str]:
+
+def _first_unasked(itv: InterviewRecord, key: str, ids: List[str]) -> Optional[str]:
+    """
+    First id in `ids` not yet asked. The per-interview cursor only moves past asked
+    ids, so across an interview each list is scanned once (amortized O(1) per pick).
+    """
+    if itv.cursors.get("_gen") != generation():
+        itv.cursors = {"_gen": generation()}  # bank reloaded: list positions changed
+    i = itv.cursors.get(key, 0)
+    while i < len(ids) and ids[i] in itv.asked:
+        i += 1
+    itv.cursors[key] = i
+    return ids[i] if i < len(ids) else None
+
+
+def _choose_next(itv: InterviewRecord) -> Optional[str]:
     """
     Simple adaptive chooser:
     - If last 2 final scores >= 4 -> target 'H'
     - Else if last final score <= 2 -> target 'E'
     - Else default 'M'
+    Pending (not yet graded) answers are skipped: the rule looks at the most
+    recent *graded* scores, so a deferred grade never moves the target.
     Falls back to first unasked if none match target.
+    In SELECTION_MODE=irt, picks the unasked item closest to the ability estimate.
     """
-    itv = _STORE[iid]
-    ids: List[str] = itv["question_ids"]
-    asked = set(itv["asked"])
-    target = "M"
+    if SELECTION_MODE == "irt":
+        return irt.select(itv.theta, itv.asked)
 
-    recent = itv["scores"]
-    if len(recent) >= 2 and all(s.get("final_score", 0.0) >= 4 for s in recent[-2:]):
+    target = "M"
+    recent = [s for s in itv.scores[-MAX_QUESTIONS:] if s.status == "graded"]
+    if len(recent) >= 2 and all(s.final_score >= 4 for s in recent[-2:]):
         target = "H"
-    elif recent and recent[-1].get("final_score", 0.0) <= 2:
+    elif recent and recent[-1].final_score <= 2:
         target = "E"
 
-    # try to find next by target difficulty
-    for qid in ids:
-        if qid in asked:
-            continue
-        q = get_question_by_id(qid)
-        if q and q.get("difficulty", "M") == target:
-            return qid
-
-    # fallback: first unasked
-    for qid in ids:
-        if qid not in asked:
-            return qid
-
-    return None
+    # try to find next by target difficulty, else fall back to first unasked
+    return _first_unasked(itv, target, ids_by_difficulty(target)) or _first_unasked(itv, "*", question_ids())
 
 
 def next_question(iid: str):
-    itv = _STORE[iid]
-    if len(itv["asked"]) >= MAX_QUESTIONS:
-        return None
+    with _STORE.edit(iid) as itv:
+        if len(itv.asked) >= MAX_QUESTIONS:
+            return None
 
-    qid = _choose_next(iid)
-    if not qid:
-        return None
+        qid = _choose_next(itv)
+        if not qid:
+            return None
 
-    itv["asked"].append(qid)
+        itv.asked.append(qid)
     q = get_question_by_id(qid)
     return {
         "id": q["id"],
@@ -0,0 +1,129 @@
+import os, bisect, threading, time
+from typing import Dict, List, Tuple
+
+# Hot-path latency histograms and counters, exported in Prometheus text format.
+# Metrics are created once (usually at import) and kept as handles, so a sample
+# costs one perf_counter pair, a bisect over fixed buckets and a locked increment.
+TIMINGS_ENABLED = os.getenv("TIMINGS_ENABLED", "1").lower() not in ("0", "false", "no")
+
+# seconds; chosen to cover both in-process graders (~100us) and LLM calls (seconds)
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class _Timer:
+    __slots__ = ("hist", "t0")
+
+    def __init__(self, hist: "Histogram"):
+        self.hist = hist
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.t0)
+        return False
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count", "_lock")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, secs: float):
+        if not TIMINGS_ENABLED:
+            return
+        i = bisect.bisect_left(BUCKETS, secs)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += secs
+            self.count += 1
+
+    def time(self) -> _Timer:
+        """`with hist.time(): ...` observes the block's wall time."""
+        return _Timer(self)
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class Counter:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, n: int = 1):
+        if not TIMINGS_ENABLED:
+            return
+        with self._lock:
+            self.value += n
+
+
+_LOCK = threading.Lock()
+_HELP: Dict[str, Tuple[str, str]] = {}  # name -> (type, help)
+_METRICS: Dict[_Key, object] = {}
+
+
+def _get(kind: str, cls, name: str, help_: str, labels: Dict[str, str]):
+    key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+    m = _METRICS.get(key)
+    if m is None:
+        with _LOCK:
+            _HELP.setdefault(name, (kind, help_))
+            m = _METRICS.setdefault(key, cls())
+    return m
+
+
+def histogram(name: str, help_: str = "", **labels) -> Histogram:
+    """Histogram for `name` with these label values (created on first use, then shared)."""
+    return _get("histogram", Histogram, name, help_, labels)
+
+
+def counter(name: str, help_: str = "", **labels) -> Counter:
+    return _get("counter", Counter, name, help_, labels)
+
+
+def _fmt_labels(labels, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def render() -> str:
+    """All metrics in Prometheus text exposition format (0.0.4)."""
+    with _LOCK:
+        items = sorted(_METRICS.items(), key=lambda kv: kv[0])
+        helps = dict(_HELP)
+    out: List[str] = []
+    seen = set()
+    for (name, labels), m in items:
+        if name not in seen:
+            seen.add(name)
+            kind, help_ = helps[name]
+            if help_:
+                out.append(f"# HELP {name} {help_}")
+            out.append(f"# TYPE {name} {kind}")
+        if isinstance(m, Histogram):
+            counts, total, n = m.snapshot()
+            cum = 0
+            for bound, c in zip(BUCKETS, counts):
+                cum += c
+                le = 'le="%g"' % bound
+                out.append(f"{name}_bucket{_fmt_labels(labels, le)} {cum}")
+            inf = 'le="+Inf"'
+            out.append(f"{name}_bucket{_fmt_labels(labels, inf)} {n}")
+            out.append(f"{name}_sum{_fmt_labels(labels)} {total:.6f}")
+            out.append(f"{name}_count{_fmt_labels(labels)} {n}")
+        else:
+            out.append(f"{name}{_fmt_labels(labels)} {m.value}")
+    return "\n".join(out) + "\n"
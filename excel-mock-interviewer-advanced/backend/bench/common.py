@@ -0,0 +1,63 @@
+import os, sys, json, time, platform, pathlib, subprocess
+from typing import Any, Dict, List, Optional
+
+HERE = pathlib.Path(__file__).parent
+RESULTS_DIR = HERE / "results"
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """count, mean, p50/p95/p99 and max of `samples` (nearest-rank)."""
+    if not samples:
+        return {"count": 0}
+    s = sorted(samples)
+    def rank(p):
+        return s[min(len(s) - 1, max(0, int(round(p / 100.0 * len(s) + 0.5)) - 1))]
+    return {"count": len(s), "mean": round(sum(s) / len(s), 4), "p50": round(rank(50), 4),
+            "p95": round(rank(95), 4), "p99": round(rank(99), 4), "max": round(s[-1], 4)}
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def save(kind: str, results: Dict[str, Any], out: Optional[str] = None) -> pathlib.Path:
+    """Write results plus run metadata to `out` (default bench/results/<kind>-<time>.json)."""
+    doc = {"kind": kind, "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "git": _git_rev(),
+           "python": platform.python_version(), "platform": platform.platform(), **results}
+    path = pathlib.Path(out) if out else RESULTS_DIR / f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(doc, indent=2))
+    return path
+
+
+def compare(current: Dict[str, Dict[str, float]], baseline_path: str, metric: str, threshold: float) -> List[str]:
+    """Names whose `metric` grew by more than `threshold` (fraction) against a saved result."""
+    base = json.loads(pathlib.Path(baseline_path).read_text())["results"]
+    slower = []
+    for name, cur in current.items():
+        old = base.get(name, {}).get(metric)
+        new = cur.get(metric)
+        if old and new is not None:
+            ratio = new / old
+            mark = "  REGRESSION" if ratio > 1 + threshold else ""
+            print(f"{name:40s} {old:>12.4f} -> {new:>12.4f} ({ratio:5.2f}x){mark}", file=sys.stderr)
+            if mark:
+                slower.append(name)
+    return slower
+
+
+def isolated_env(tmpdir: str, llm_base_url: Optional[str] = None):
+    """Point the app at throwaway storage (and the LLM stub) before it is imported."""
+    os.environ["DB_URL"] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    os.environ.setdefault("SESSION_DB", os.path.join(tmpdir, "sessions.db"))
+    os.environ.setdefault("BANK_STORE", os.path.join(tmpdir, "bank_store.sqlite"))
+    os.environ.setdefault("DATASET_CACHE_DIR", os.path.join(tmpdir, "columnar"))
+    if llm_base_url:
+        os.environ["LLM_BASE_URL"] = llm_base_url
+        os.environ["OPENAI_API_KEY"] = "bench-stub"
+    else:
+        os.environ.pop("OPENAI_API_KEY", None)
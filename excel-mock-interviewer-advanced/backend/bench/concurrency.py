@@ -0,0 +1,109 @@
+"""
+Concurrency check: many interviews at once, every answer submitted several times in parallel.
+
+    python -m bench.concurrency --interviews 200 --concurrency 32 --duplicates 3 [--url http://host:8000]
+
+Each answer is posted --duplicates times at once (a double-clicking user). Exactly one of
+them must be graded (200) and the others rejected (409); afterwards /report must list
+every asked question exactly once. Throughput (interviews/s, answers/s) is saved as JSON
+so a run against an older build (--url) can be compared with --compare. Exits 1 on any
+lost or duplicated answer.
+"""
+import sys, time, random, asyncio, argparse
+from collections import Counter
+from typing import Any, Dict, List
+
+import httpx
+
+from bench import common
+from bench.loadtest import ANSWERS, GENERIC, _serve_in_process
+
+
+async def _interview(client: httpx.AsyncClient, rng: random.Random, args, out: Dict[str, Any], lat: List[float]):
+    r = await client.post("/start", json={"candidate_email": "bench@example.com"})
+    r.raise_for_status()
+    iid, q = r.json()["interview_id"], r.json()["question"]
+    asked = []
+    while q:
+        asked.append(q["id"])
+        generic = GENERIC.get(q["kind"], GENERIC["text"])
+        body = {"interview_id": iid, "question_id": q["id"],
+                **(generic if rng.random() < args.wrong_rate else ANSWERS.get(q["id"], generic))}
+        t0 = time.perf_counter()
+        rs = await asyncio.gather(*(client.post("/answer", json=body) for _ in range(args.duplicates)))
+        lat.append((time.perf_counter() - t0) * 1000.0)
+        codes = Counter(x.status_code for x in rs)
+        out["status"].update(codes)
+        if codes[200] != 1 or codes[409] != args.duplicates - 1:
+            out["bad_submits"] += 1
+        nxt = [x.json() for x in rs if x.status_code == 200]
+        q = nxt[0].get("next_question") if nxt else None
+    rep = (await client.get(f"/report/{iid}")).json()
+    got = Counter(a["qid"] for a in rep.get("answers", []))
+    out["lost"] += sum(1 for qid in asked if got[qid] == 0)
+    out["duplicated"] += sum(n - 1 for n in got.values() if n > 1)
+    out["answers"] += len(asked)
+    out["interviews"] += 1
+
+
+async def _run(url: str, args) -> Dict[str, Any]:
+    out: Dict[str, Any] = {"interviews": 0, "answers": 0, "lost": 0, "duplicated": 0, "bad_submits": 0,
+                           "errors": 0, "status": Counter()}
+    lat: List[float] = []
+    todo = iter(range(args.interviews))
+
+    async def user(n: int):
+        rng = random.Random(args.seed + n)
+        async with httpx.AsyncClient(base_url=url, timeout=120.0,
+                                     limits=httpx.Limits(max_connections=args.duplicates * 2)) as client:
+            for _ in todo:
+                try:
+                    await _interview(client, rng, args, out, lat)
+                except (httpx.HTTPError, ValueError):
+                    out["errors"] += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(user(n) for n in range(args.concurrency)))
+    wall = time.perf_counter() - t0
+    out["status"] = {str(k): v for k, v in sorted(out["status"].items())}
+    return {
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "wall_secs": round(wall, 3),
+        **out,
+        "interviews_per_sec": round(out["interviews"] / wall, 2),
+        "answers_per_sec": round(out["answers"] / wall, 2),
+        "results": {"answer": common.percentiles(lat)},  # ms per (duplicated) submit
+    }
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m bench.concurrency")
+    p.add_argument("--url", help="check a running server instead of an in-process one")
+    p.add_argument("--interviews", type=int, default=100)
+    p.add_argument("--concurrency", type=int, default=32)
+    p.add_argument("--duplicates", type=int, default=3, help="copies of every answer posted at once")
+    p.add_argument("--wrong-rate", type=float, default=0.3)
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--text-grading", choices=("sync", "async"), default="sync")
+    p.add_argument("--llm-latency-ms", type=float, default=300.0)
+    p.add_argument("--llm-jitter-ms", type=float, default=50.0)
+    p.add_argument("--llm-fail-rate", type=float, default=0.0)
+    p.add_argument("--out", help="result file (default bench/results/concurrency-<time>.json)")
+    p.add_argument("--compare", help="earlier result file; exit 1 if the p95 regressed by more than --threshold")
+    p.add_argument("--threshold", type=float, default=0.2)
+    args = p.parse_args(argv)
+    out = asyncio.run(_run(args.url or _serve_in_process(args), args))
+    r = out["results"]["answer"]
+    print(f"{out['interviews']} interviews, {out['answers']} answers x{args.duplicates}: "
+          f"{out['interviews_per_sec']} interviews/s, {out['answers_per_sec']} answers/s, "
+          f"p50={r['p50']:.1f}ms p95={r['p95']:.1f}ms; status {out['status']}", file=sys.stderr)
+    print(f"lost={out['lost']} duplicated={out['duplicated']} bad_submits={out['bad_submits']} errors={out['errors']}",
+          file=sys.stderr)
+    print(common.save("concurrency", out, args.out))
+    failed = out["lost"] or out["duplicated"] or out["bad_submits"] or out["errors"]
+    if failed or (args.compare and common.compare(out["results"], args.compare, "p95", args.threshold)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+OpenAI-compatible chat-completions stub for benchmarks.
+
+    python -m bench.llm_stub --port 8081 --latency-ms 300 --jitter-ms 100 --fail-rate 0.02
+
+Then run the API with LLM_BASE_URL=http://127.0.0.1:8081/v1 OPENAI_API_KEY=stub.
+Every request scores 4 after the configured latency; `fail-rate` of them get an HTTP 500.
+Requests with "stream": true (POST /answer/stream) get the feedback as chat.completion.chunk
+events, one word every --token-ms after the latency; `break-rate` of those streams are cut
+off halfway (no [DONE]), as a dropped connection would be.
+"""
+import json, time, random, argparse, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    jitter = 0.0
+    fail_rate = 0.0
+    token = 0.0
+    break_rate = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, ctype: str = "application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        if random.random() < self.fail_rate:
+            return self._send(500, b'{"error": {"message": "stub failure"}}')
+        if json.loads(body or b"{}").get("stream"):
+            return self._stream()
+        content = json.dumps({"score": 4, "reasons": ["stub"], "tags": []})
+        self._send(200, json.dumps({
+            "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": "stub",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }).encode())
+
+    def _stream(self):
+        words = STREAM_TEXT.split(" ")
+        cut = len(words) // 2 if random.random() < self.break_rate else None
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, w in enumerate(words):
+            if i == cut:  # drop the connection without the terminating chunk
+                self.close_connection = True
+                return
+            if i:
+                time.sleep(self.token)
+            self._chunk({"id": "stub", "object": "chat.completion.chunk", "created": int(time.time()), "model": "stub",
+                         "choices": [{"index": 0, "finish_reason": None,
+                                      "delta": {"content": w if i == len(words) - 1 else w + " "}}]})
+        self._chunk("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _chunk(self, event):
+        data = b"data: " + (event if isinstance(event, str) else json.dumps(event)).encode() + b"\n\n"
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+STREAM_TEXT = ("- Mentions absolute references ($A$1) for fixed inputs.\n"
+               "- Table references would keep the formula readable as rows are added.\n"
+               "SCORE: 4")
+
+
+def start(latency_ms: float = 0.0, jitter_ms: float = 0.0, fail_rate: float = 0.0, port: int = 0,
+          token_ms: float = 20.0, break_rate: float = 0.0):
+    """Serve in a daemon thread; returns (server, base_url for LLM_BASE_URL)."""
+    handler = type("Handler", (_Handler,), {"latency": latency_ms / 1000.0, "jitter": jitter_ms / 1000.0,
+                                            "fail_rate": fail_rate, "token": token_ms / 1000.0,
+                                            "break_rate": break_rate})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="llm-stub", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m bench.llm_stub")
+    p.add_argument("--port", type=int, default=8081)
+    p.add_argument("--latency-ms", type=float, default=300.0)
+    p.add_argument("--jitter-ms", type=float, default=0.0)
+    p.add_argument("--fail-rate", type=float, default=0.0)
+    p.add_argument("--token-ms", type=float, default=20.0, help="delay between streamed words")
+    p.add_argument("--break-rate", type=float, default=0.0, help="fraction of streams cut off halfway")
+    a = p.parse_args(argv)
+    server, url = start(a.latency_ms, a.jitter_ms, a.fail_rate, a.port, a.token_ms, a.break_rate)
+    print(f"LLM stub on {url}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+End-to-end load test: full interviews against the API at a fixed concurrency.
+
+    python -m bench.loadtest --interviews 200 --concurrency 16 [--url http://host:8000]
+
+Without --url the app is started in-process on a free port (throwaway DB, session
+store and bank store under a temp dir) with the LLM pointed at bench.llm_stub. Each
+virtual user runs interviews back to back: /start, then /answer for every question
+(formula / value / table / text; a hint first on --hint-rate of them, a wrong answer on
+--wrong-rate, which steers the adaptive flow onto easier text questions), then /report.
+Latency percentiles are recorded per endpoint and per grader kind and saved as JSON.
+"""
+import os, sys, time, random, socket, argparse, tempfile, threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import httpx
+
+from bench import common, llm_stub
+
+# Answers that grade well for the shipped bank; unknown questions get a generic answer of their kind.
+ANSWERS: Dict[str, Dict[str, Any]] = {
+    "q_sumifs_east_pencil": {"answer_text": '=SUMIFS(D:D,A:A,"East",C:C,"Pencil")'},
+    "q_sum_value_check": {"answer_text": "56"},
+    "q_lookup_rep_item_price": {"answer_text": '=XLOOKUP(1,(B:B="Kivell")*(C:C="Binder"),E:E)'},
+    "q_lookup_value_check": {"answer_text": "19.99"},
+    "q_pivot_table": {"answer_table": [{"Region": "East", "Sales": 1805.44}, {"Region": "West", "Sales": 958.93},
+                                       {"Region": "Central", "Sales": 789.46}]},
+    "q_efficiency_text": {"answer_text": "Use $ absolute refs to anchor ranges and a structured table reference."},
+    "q_sumifs_three_criteria": {"answer_text": '=SUMIFS(D:D,A:A,"East",C:C,"Pencil",B:B,"Jones")'},
+}
+GENERIC = {
+    "formula": {"answer_text": "=SUM(D:D)"},
+    "value": {"answer_text": "0"},
+    "table": {"answer_table": [{"Region": "East", "Sales": 0}]},
+    "text": {"answer_text": "I would use absolute references and named ranges."},
+}
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def timed(self, client: httpx.Client, name: str, method: str, path: str, **kw):
+        t0 = time.perf_counter()
+        try:
+            r = client.request(method, path, **kw)
+            ok = r.status_code == 200
+        except httpx.HTTPError:
+            r, ok = None, False
+        ms = (time.perf_counter() - t0) * 1000.0
+        with self._lock:
+            self.samples[name].append(ms)
+            if not ok:
+                self.errors[name] += 1
+        return r.json() if ok else None
+
+
+def _interview(client: httpx.Client, rec: Recorder, rng: random.Random, hint_rate: float, wrong_rate: float) -> bool:
+    r = rec.timed(client, "start", "POST", "/start", json={"candidate_email": "bench@example.com"})
+    if not r:
+        return False
+    iid, q = r["interview_id"], r["question"]
+    while q:
+        base = {"interview_id": iid, "question_id": q["id"]}
+        if rng.random() < hint_rate:
+            rec.timed(client, "hint", "POST", "/answer", json={**base, "want_hint": True})
+        generic = GENERIC.get(q["kind"], GENERIC["text"])
+        # wrong answers push the adaptive chooser towards easy (often text) questions
+        body = {**base, **(generic if rng.random() < wrong_rate else ANSWERS.get(q["id"], generic))}
+        r = rec.timed(client, f"answer:{q['kind']}", "POST", "/answer", json=body)
+        if not r:
+            return False
+        q = r.get("next_question")
+    return rec.timed(client, "report", "GET", f"/report/{iid}") is not None
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _serve_in_process(args) -> str:
+    tmp = tempfile.mkdtemp(prefix="bench-")
+    _, stub_url = llm_stub.start(args.llm_latency_ms, args.llm_jitter_ms, args.llm_fail_rate)
+    common.isolated_env(tmp, stub_url)
+    os.environ["TEXT_GRADING_MODE"] = args.text_grading
+    import uvicorn
+    from app.main import app
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="bench-api", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def run(args) -> Dict[str, Any]:
+    url = args.url or _serve_in_process(args)
+    rec = Recorder()
+    done = {"ok": 0, "failed": 0}
+    lock = threading.Lock()
+    todo = iter(range(args.interviews))
+
+    def user(n: int):
+        rng = random.Random(args.seed + n)
+        with httpx.Client(base_url=url, timeout=60.0) as client:
+            while True:
+                with lock:
+                    if next(todo, None) is None:
+                        return
+                ok = _interview(client, rec, rng, args.hint_rate, args.wrong_rate)
+                with lock:
+                    done["ok" if ok else "failed"] += 1
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(user, range(args.concurrency)))
+    wall = time.perf_counter() - t0
+
+    results = {}
+    for name, samples in sorted(rec.samples.items()):
+        results[name] = {**common.percentiles(samples), "errors": rec.errors.get(name, 0),
+                         "rps": round(len(samples) / wall, 2)}
+    answers = [ms for name, s in rec.samples.items() if name.startswith("answer:") for ms in s]
+    results["answer"] = {**common.percentiles(answers), "errors": sum(v for k, v in rec.errors.items() if k.startswith("answer:")),
+                         "rps": round(len(answers) / wall, 2)}
+    return {
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "wall_secs": round(wall, 3),
+        "interviews": done,
+        "interviews_per_sec": round(done["ok"] / wall, 2),
+        "requests_per_sec": round(sum(len(s) for s in rec.samples.values()) / wall, 2),
+        "results": results,  # latencies in ms
+    }
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m bench.loadtest")
+    p.add_argument("--url", help="benchmark a running server instead of an in-process one")
+    p.add_argument("--interviews", type=int, default=100)
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--hint-rate", type=float, default=0.2)
+    p.add_argument("--wrong-rate", type=float, default=0.3)
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--text-grading", choices=("sync", "async"), default="sync")
+    p.add_argument("--llm-latency-ms", type=float, default=300.0)
+    p.add_argument("--llm-jitter-ms", type=float, default=50.0)
+    p.add_argument("--llm-fail-rate", type=float, default=0.0)
+    p.add_argument("--out", help="result file (default bench/results/loadtest-<time>.json)")
+    p.add_argument("--compare", help="earlier result file; exit 1 if any p95 regressed by more than --threshold")
+    p.add_argument("--threshold", type=float, default=0.2)
+    args = p.parse_args(argv)
+    out = run(args)
+    for name, r in out["results"].items():
+        if r.get("count"):
+            print(f"{name:16s} n={r['count']:<6d} p50={r['p50']:8.2f}ms p95={r['p95']:8.2f}ms "
+                  f"p99={r['p99']:8.2f}ms errors={r['errors']}", file=sys.stderr)
+    print(f"{out['interviews_per_sec']} interviews/s, {out['requests_per_sec']} req/s", file=sys.stderr)
+    print(common.save("loadtest", out, args.out))
+    if args.compare and common.compare(out["results"], args.compare, "p95", args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Microbenchmarks for the per-answer hot path.
+
+    python -m bench.micro [--repeat 200] [--only NAME] [--compare bench/results/micro-....json]
+
+Each benchmark is timed in `repeat` samples of N calls (N calibrated so one sample takes
+about --sample-ms); per-call times in microseconds are summarized as p50/p95/p99 and
+saved as JSON. --compare exits 1 when a p50 regressed by more than --threshold.
+"""
+import sys, time, argparse, tempfile
+from typing import Callable, Dict, List, Tuple
+
+from bench import common
+from bench.loadtest import ANSWERS
+
+
+def _timer(fn: Callable[[], object], repeat: int, sample_ms: float) -> List[float]:
+    n = 1
+    while True:  # calibrate calls per sample
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        if (time.perf_counter() - t0) * 1000.0 >= sample_ms or n >= 1 << 20:
+            break
+        n *= 2
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        out.append((time.perf_counter() - t0) / n * 1e6)
+    return out
+
+
+def benchmarks() -> List[Tuple[str, Callable[[], object]]]:
+    from app.main import detect_kind
+    from app.grading import formula_rules, pandas_eval, answer_keys
+    from app.questions.bank import get_question_by_id
+    from app.services import state, report
+    from app.db import init_db
+
+    init_db()
+    answer_keys.warm()
+    q = {qid: get_question_by_id(qid) for qid in ANSWERS}
+    table = ANSWERS["q_pivot_table"]["answer_table"]
+
+    # an interview half way through: three graded answers, three questions asked
+    itv = state.create_interview("bench@example.com")
+    for qid in ("q_sumifs_east_pencil", "q_sum_value_check", "q_pivot_table"):
+        state.next_question(itv.id)
+        itv = state.get_interview(itv.id)
+        asked = itv.asked[-1]
+        a = ANSWERS.get(asked, {})
+        state.record_answer(itv.id, asked, a.get("answer_text"), a.get("answer_table"), 4.0, "bench")
+    itv = state.get_interview(itv.id)
+
+    def report_uncached():
+        itv.rev += 1  # what a new answer does
+        return report.generate_report(itv)
+
+    return [
+        ("detect_kind:formula", lambda: detect_kind('=SUMIFS(D:D,A:A,"East")', None)),
+        ("detect_kind:value", lambda: detect_kind("19.99", None)),
+        ("detect_kind:text", lambda: detect_kind("use absolute references", None)),
+        ("detect_kind:table", lambda: detect_kind(None, table)),
+        ("evaluate_formula:sumifs", lambda: formula_rules.evaluate_formula(
+            q["q_sumifs_east_pencil"], ANSWERS["q_sumifs_east_pencil"]["answer_text"])),
+        ("evaluate_formula:xlookup", lambda: formula_rules.evaluate_formula(
+            q["q_lookup_rep_item_price"], ANSWERS["q_lookup_rep_item_price"]["answer_text"])),
+        ("evaluate_formula:wrong", lambda: formula_rules.evaluate_formula(
+            q["q_sumifs_east_pencil"], '=SUMIFS(D:D,A:A,"West",C:C,"Pencil")')),
+        ("pandas_eval:value", lambda: pandas_eval.evaluate(q["q_sum_value_check"], "56", None)),
+        ("pandas_eval:table", lambda: pandas_eval.evaluate(q["q_pivot_table"], None, table)),
+        ("choose_next:adaptive", lambda: state._choose_next(itv)),
+        ("generate_report:cached", lambda: report.generate_report(itv)),
+        ("generate_report:uncached", report_uncached),
+        ("generate_report:summary_only", lambda: report.generate_report(itv, "none")),
+    ]
+
+
+def run(repeat: int, sample_ms: float, only: str = None) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for name, fn in benchmarks():
+        if only and only not in name:
+            continue
+        results[name] = common.percentiles(_timer(fn, repeat, sample_ms))
+        r = results[name]
+        print(f"{name:32s} p50={r['p50']:10.2f}us p95={r['p95']:10.2f}us p99={r['p99']:10.2f}us", file=sys.stderr)
+    return results
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m bench.micro")
+    p.add_argument("--repeat", type=int, default=200)
+    p.add_argument("--sample-ms", type=float, default=5.0)
+    p.add_argument("--only", help="substring filter on benchmark names")
+    p.add_argument("--out", help="result file (default bench/results/micro-<time>.json)")
+    p.add_argument("--compare", help="earlier result file; exit 1 if any p50 regressed by more than --threshold")
+    p.add_argument("--threshold", type=float, default=0.2)
+    args = p.parse_args(argv)
+    common.isolated_env(tempfile.mkdtemp(prefix="bench-"))
+    results = run(args.repeat, args.sample_ms, args.only)
+    print(common.save("micro", {"config": {"repeat": args.repeat, "sample_ms": args.sample_ms}, "unit": "us",
+                                "results": results}, args.out))
+    if args.compare and common.compare(results, args.compare, "p50", args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
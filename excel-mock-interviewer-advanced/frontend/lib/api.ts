@@ -47,6 +47,36 @@ export async function apiAnswer(payload: any) {
   return asJson(res);
 }
 
+// Same as apiAnswer, over Server-Sent Events: onEvent sees "received", "feedback" {delta}
+// pieces and "fallback" {reason}; resolves with the "result" body (same shape as /answer).
+export async function apiAnswerStream(payload: any, onEvent: (event: string, data: any) => void) {
+  const res = await fetch(`${BASE}/answer/stream`, {
+    method: 'POST',
+    headers: {'Content-Type':'application/json', 'Accept':'text/event-stream'},
+    body: JSON.stringify(payload),
+  });
+  if (!res.ok || !res.body) throw new Error(`Failed /answer/stream: ${res.status} ${res.statusText}`);
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buf = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buf += decoder.decode(value, { stream: true });
+    let end;
+    while ((end = buf.indexOf('\n\n')) >= 0) {
+      const block = buf.slice(0, end);
+      buf = buf.slice(end + 2);
+      const event = (block.match(/^event: (.*)$/m) || [])[1] || 'message';
+      const data = JSON.parse((block.match(/^data: (.*)$/m) || [])[1] || 'null');
+      if (event === 'result') return data;
+      if (event === 'error') throw new Error(`Failed /answer/stream: ${data.status} ${data.detail}`);
+      onEvent(event, data);
+    }
+  }
+  throw new Error('Failed /answer/stream: stream ended without a result');
+}
+
 export async function apiReport(interview_id: string) {
   const res = await fetch(`${BASE}/report/${encodeURIComponent(interview_id)}`);
   if (!res.ok) throw new Error(`Failed /report: ${res.status} ${res.statusText}`);
@@ -55,7 +55,7 @@
 
 
 import { useEffect, useMemo, useState } from 'react';
-import { apiStart, apiAnswer, apiReport } from '../lib/api';
+import { apiStart, apiAnswer, apiAnswerStream, apiReport } from '../lib/api';
 
 type Q = { id: string; prompt: string; kind: 'formula'|'value'|'table'|'text'; skill: string; max_score: number; hint?: string };
 
@@ -132,12 +132,23 @@ export default function Home(){
       p.answer_text = ans;
     }
 
-    const d = await apiAnswer(p);
-
-    // server may still enforce type-guard; reflect whatever it says
-    if (d.hint){ setLog(l=>[...l,`Agent (hint): ${d.hint}`]); return; }
-
-    setLog(l=>[...l, `You: ${ans}`, `Agent: ${d.feedback} (Score: ${d.score})`]);
+    let d:any;
+    if (q.kind==='text') {
+      // stream the rubric feedback into the last log line as the model writes it
+      let streamed = '';
+      const show = (t:string) => setLog(l=>[...l.slice(0,-1), `Agent: ${t}`]);
+      setLog(l=>[...l, `You: ${ans}`, 'Agent: …']);
+      d = await apiAnswerStream(p, (event, data) => {
+        if (event==='feedback') { streamed += data.delta; show(streamed + ' …'); }
+        if (event==='fallback') { streamed = ''; show('…'); }
+      });
+      show(`${d.feedback} (Score: ${d.score})`);
+    } else {
+      d = await apiAnswer(p);
+      // server may still enforce type-guard; reflect whatever it says
+      if (d.hint){ setLog(l=>[...l,`Agent (hint): ${d.hint}`]); return; }
+      setLog(l=>[...l, `You: ${ans}`, `Agent: ${d.feedback} (Score: ${d.score})`]);
+    }
     setAns('');
 
     if (d.done){
@@ -165,7 +176,8 @@ export default function Home(){
       <h1>Excel Mock Interviewer (Advanced PoC)</h1>
 
       <div style={{border:'1px solid #ddd',borderRadius:8,padding:16,minHeight:300}}>
-        {log.map((t,i)=>(<div key={i} style={{marginBottom:8}} dangerouslySetInnerHTML={{__html:t}} />))}
+        {/* plain text: lines carry model output and the candidate's own answers */}
+        {log.map((t,i)=>(<div key={i} style={{marginBottom:8, whiteSpace:'pre-wrap'}}>{t}</div>))}
 
         {q && (
           <div style={{marginTop:16}}>